@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Сверка режимов отбора файлов: rar сам (-r/-n/-x) и collect_files_for_backup.
+
+Нужен PySide6, иначе тесты пропускаются; сверка с архивом — ещё и rar в PATH.
+Запуск:
+    python -m pytest бэкапер_папки_в_rar
+"""
+import importlib.util
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip("PySide6")
+needs_rar = pytest.mark.skipif(shutil.which("rar") is None, reason="rar не найден в PATH")
+
+_SCRIPT = os.path.join(os.path.dirname(__file__), "бэкапер_папки_в_rar.py")
+_spec = importlib.util.spec_from_file_location("backuper", _SCRIPT)
+backuper = importlib.util.module_from_spec(_spec)
+sys.modules["backuper"] = backuper
+_spec.loader.exec_module(backuper)
+
+
+def _make_tree(root, rel_paths):
+    for rel in rel_paths:
+        path = os.path.join(root, *rel.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(rel)
+
+
+def _archive_members(archive_path):
+    out = subprocess.run(
+        ["rar", "lb", archive_path], capture_output=True, text=True, check=True
+    ).stdout
+    return {line.strip().replace("\\", "/") for line in out.splitlines() if line.strip()}
+
+
+@needs_rar
+@pytest.mark.parametrize("keep_root_dir", [True, False])
+def test_rar_selection_matches_scan(tmp_path, keep_root_dir):
+    # имя проекта содержит паттерн исключения: "catalogs" и "logs"
+    project = tmp_path / "catalogs"
+    _make_tree(str(project), [
+        "main.py",
+        "applogs.py",
+        "readme.txt",
+        "happy",  # без расширения, но кончается на "py"
+        "numpy",
+        "logs/run.py",
+        "pkg/logs2/mod.py",
+        "pkg/util.py",
+        "pkg/old_backup/kept.py",
+        "old_backup/skipped.py",
+    ])
+    include_exts = {".py"}
+    exclude_patterns = {"logs"}
+
+    expected = {
+        os.path.relpath(f, project).replace(os.sep, "/")
+        for f in backuper.collect_files_for_backup(
+            str(project), include_exts, exclude_patterns, "none", 0
+        )
+    }
+
+    backup_dir = backuper.get_or_create_backup_dir(str(project))
+    archive_path, _ = backuper.create_rar_archive(
+        project_root=str(project),
+        backup_dir=backup_dir,
+        files=None,
+        include_time=True,
+        keep_root_dir=keep_root_dir,
+        include_exts=include_exts,
+        exclude_patterns=exclude_patterns,
+    )
+
+    members = _archive_members(archive_path)
+    if keep_root_dir:
+        members = {m[len("catalogs/"):] for m in members if m.startswith("catalogs/")}
+    # rar lb перечисляет и каталоги — оставляем только файлы
+    members = {m for m in members if (project / m).is_file()}
+
+    assert expected == {"main.py", "pkg/util.py", "pkg/old_backup/kept.py"}
+    assert members == expected
+
+
+def test_extension_masks_keep_the_dot():
+    switches = backuper.build_rar_selection_switches({".py", "TXT"}, set(), "b")
+    assert [s for s in switches if s.startswith("-n")] == ["-n*.py", "-n*.txt"]
+
+
+def test_wildcard_patterns_fall_back_to_scan():
+    assert backuper.patterns_need_scan({"logs", "*.tmp"})
+    assert backuper.patterns_need_scan({"data[1]"})
+    assert not backuper.patterns_need_scan({"logs", "node_modules"})
@@ -16,6 +16,9 @@ import sys
 import subprocess
 import re
 import json
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache, lru_cache
 from pathlib import Path
 from datetime import datetime
 
@@ -26,7 +29,19 @@ from PySide6.QtWidgets import (
     QLabel, QGroupBox, QComboBox, QSpinBox, QMessageBox,
     QPlainTextEdit
 )
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, QObject, QThread, QTimer, Signal
+
+try:
+    # Необязательно: pip install pyahocorasick — быстрый поиск сразу по всем паттернам
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+try:
+    # Необязательно: pip install orjson — быстрая (де)сериализация настроек
+    import orjson
+except ImportError:
+    orjson = None
 
 # ---------- Константы ----------
 
@@ -49,30 +64,76 @@ DEFAULT_EXCLUDE_PATTERNS = [
     ".pytest_cache",
 ]
 
+# Сжатие rar: -m0 (без сжатия) .. -m5 (максимальное); -m1 — быстрое
+DEFAULT_COMPRESSION_LEVEL = 1
+# Потоки rar (-mt): по числу ядер, rar принимает 1..64
+DEFAULT_RAR_THREADS = min(os.cpu_count() or 4, 64)
+
+# Потоки для параллельного обхода подпапок проекта (обход — IO-bound)
+SCAN_WORKERS = min(32, (os.cpu_count() or 4) * 2)
+
+# Задержка автосохранения настроек: серия изменений -> одна запись на диск
+SETTINGS_AUTOSAVE_MS = 1000
+
+# Период сброса буфера лога в QPlainTextEdit (вывод rar идёт сотнями строк)
+LOG_FLUSH_MS = 50
+
+# Код выхода rar: "не найдено файлов, подходящих под маски и ключи"
+RAR_EXIT_NO_FILES = 10
+
 # Путь к конфигу: %APPDATA%/drago/pythontools/backup/config.json
 CONFIG_REL_PATH = Path("drago") / "pythontools" / "backup" / "config.json"
 
+# Невидимые/служебные символы, которые игнорируем при поиске backup-папки
+_BACKUP_NAME_JUNK_RE = re.compile(r"[\u200b\s!_\-]+")
+
+# Хвост имени архива с версией: <base>_v<N>.rar
+_ARCHIVE_VERSION_RE = re.compile(r"_v(\d+)\.rar", re.IGNORECASE)
+
 
 # ---------- Вспомогательные функции ----------
 
+class NothingToBackupError(RuntimeError):
+    """rar не нашёл ни одного файла под заданные маски (режим отбора силами rar)."""
+
+
+@cache
 def get_config_path() -> Path:
+    """
+    Путь к файлу настроек (вычисляется один раз).
+    Папку не создаём — это делает save_settings перед записью.
+    """
     appdata = os.getenv("APPDATA")
     if appdata:
         base = Path(appdata)
     else:
         # На всякий случай под *nix
         base = Path.home() / ".config"
-    cfg_path = base / CONFIG_REL_PATH
-    cfg_path.parent.mkdir(parents=True, exist_ok=True)
-    return cfg_path
+    return base / CONFIG_REL_PATH
 
 
+def dump_settings_json(data: dict) -> bytes:
+    """Сериализует настройки в UTF-8 JSON (orjson, если установлен)."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def load_settings_json(raw: bytes):
+    """Разбирает JSON настроек (orjson, если установлен)."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw.decode("utf-8"))
+
+
+@lru_cache(maxsize=4096)
 def normalize_backup_name(name: str) -> str:
     """
     Нормализуем имя папки для поиска backup-папки.
     Убираем невидимые/служебные символы и приводим к нижнему регистру.
+    Имена папок сильно повторяются (__pycache__, .git...), поэтому кэшируем.
     """
-    return re.sub(r"[\u200b\s!_\-]+", "", name.lower())
+    return _BACKUP_NAME_JUNK_RE.sub("", name.lower())
 
 
 def get_or_create_backup_dir(project_root: str) -> str:
@@ -115,6 +176,90 @@ def get_or_create_backup_dir(project_root: str) -> str:
     return full
 
 
+def _scan_dir(top: str, rel_dir_lower: str, skip_dir):
+    """
+    Один уровень обхода через os.scandir.
+    Возвращает (DirEntry файлов, [(путь_подпапки, её_rel_lower), ...]).
+
+    skip_dir(name, rel_lower) -> True, если в каталог заходить не нужно.
+    """
+    file_entries = []
+    subdirs = []
+    try:
+        with os.scandir(top) as it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+
+                if not is_dir:
+                    file_entries.append(entry)
+                    continue
+
+                # симлинки на папки, как и os.walk, не обходим
+                if entry.is_symlink():
+                    continue
+
+                name_lower = entry.name.lower()
+                if rel_dir_lower:
+                    rel_lower = rel_dir_lower + "/" + name_lower
+                else:
+                    rel_lower = name_lower
+
+                if not skip_dir(entry.name, rel_lower):
+                    subdirs.append((entry.path, rel_lower))
+    except OSError:
+        pass
+
+    return file_entries, subdirs
+
+
+def _walk_scandir(top: str, rel_dir_lower: str, skip_dir):
+    """
+    Рекурсивный обход через os.scandir (аналог os.walk без followlinks).
+    Отдаёт пары (относительный_путь_каталога_в_нижнем_регистре, DirEntry файла).
+    """
+    file_entries, subdirs = _scan_dir(top, rel_dir_lower, skip_dir)
+
+    for entry in file_entries:
+        yield rel_dir_lower, entry
+
+    for path, rel_lower in subdirs:
+        yield from _walk_scandir(path, rel_lower, skip_dir)
+
+
+def build_pattern_matcher(patterns: set[str]):
+    """
+    Возвращает функцию matches(text) -> bool: есть ли в text хоть один паттерн.
+
+    Если установлен pyahocorasick — строим автомат Ахо-Корасик один раз,
+    и каждая строка проверяется за один проход независимо от числа паттернов.
+    Иначе — одна скомпилированная регулярка-альтернация (поиск идёт в C,
+    а не перебором подстрок в Python).
+
+    Частый случай — имя целиком совпадает с паттерном (.git, .venv,
+    __pycache__): он отсекается одной проверкой по множеству, до поиска
+    подстрок. Подстрочная семантика при этом не меняется.
+    """
+    if not patterns:
+        return lambda text: False
+
+    exact = frozenset(patterns)
+
+    if ahocorasick is not None:
+        automaton = ahocorasick.Automaton()
+        for p in patterns:
+            automaton.add_word(p, p)
+        automaton.make_automaton()
+        return lambda text: (
+            text in exact or next(automaton.iter(text), None) is not None
+        )
+
+    exclude_re = re.compile("|".join(re.escape(p) for p in patterns))
+    return lambda text: text in exact or exclude_re.search(text) is not None
+
+
 def collect_files_for_backup(
     project_root: str,
     include_exts: set[str],
@@ -139,65 +284,100 @@ def collect_files_for_backup(
 
     # нормализуем список исключений: в нижний регистр, без пробелов
     patterns = {p.strip().lower() for p in exclude_patterns if p.strip()}
+    matches = build_pattern_matcher(patterns)
 
-    project_root = os.path.abspath(project_root)
-
-    for root, dirs, filenames in os.walk(project_root):
-        root_abs = os.path.abspath(root)
-
-        # Фильтруем каталоги
-        new_dirs = []
-        for d in dirs:
-            d_lower = d.lower()
-
-            # Не заходим в папку бэкапов
-            if normalize_backup_name(d) == "backup":
-                continue
-
-            # Не заходим в папки, чьё имя совпало с каким-либо паттерном
-            if any(p in d_lower for p in patterns):
-                continue
+    # Паттерны со слешем могут попасть на стык "папка/файл" —
+    # только их имеет смысл проверять по полному пути файла
+    path_patterns = {p for p in patterns if "/" in p}
+    matches_path = build_pattern_matcher(path_patterns)
 
-            new_dirs.append(d)
-        dirs[:] = new_dirs
+    # расширения без точки: сравниваем с хвостом после rpartition(".")
+    ext_set = frozenset(e.strip().lstrip(".").lower() for e in include_exts)
 
-        for fname in filenames:
-            full_path = os.path.join(root, fname)
-
-            # относительный путь относительно корня проекта
-            rel_path = os.path.relpath(full_path, project_root)
-            rel_norm = rel_path.replace(os.sep, "/")
-            rel_lower = rel_norm.lower()
-            base_lower = fname.lower()
-
-            # ---- фильтр по паттернам в пути/имени ----
-            if any(p in base_lower or p in rel_lower for p in patterns):
-                continue
-
-            ext = os.path.splitext(fname)[1].lower()
-
-            # Фильтр по расширениям
-            if include_exts and ext not in include_exts:
-                continue
-
-            # Фильтр по размеру
-            if size_mode != "none":
-                try:
-                    size = os.path.getsize(full_path)
-                except OSError:
-                    continue
+    project_root = os.path.abspath(project_root)
 
-                if size_mode == "max" and size > size_limit_bytes:
-                    continue
-                if size_mode == "min" and size < size_limit_bytes:
-                    continue
+    def skip_dir(name: str, rel_lower: str) -> bool:
+        # Не заходим в папку бэкапов — она бывает только в корне проекта
+        # (см. get_or_create_backup_dir), глубже имя не нормализуем вовсе
+        if "/" not in rel_lower and normalize_backup_name(name).endswith("backup"):
+            return True
+        # Не заходим в папки, чьё имя или путь совпали с каким-либо паттерном
+        return matches(name.lower()) or matches(rel_lower)
+
+    def accept(rel_dir_lower: str, entry: os.DirEntry) -> bool:
+        fname = entry.name
+        base_lower = fname.lower()
+
+        # Фильтр по расширениям — самый дешёвый, поэтому первым: паттерны
+        # дальше проверяются только на уже подходящих по типу файлах.
+        # Как у os.path.splitext, точки в начале имени (".gitignore")
+        # расширением не считаются.
+        if ext_set:
+            _, dot, ext = base_lower.lstrip(".").rpartition(".")
+            if not dot or ext not in ext_set:
+                return False
+
+        # ---- фильтр по паттернам в имени ----
+        # (путь каталога уже проверен при обходе)
+        if matches(base_lower):
+            return False
+
+        if path_patterns:
+            if rel_dir_lower:
+                rel_lower = rel_dir_lower + "/" + base_lower
+            else:
+                rel_lower = base_lower
+            if matches_path(rel_lower):
+                return False
+
+        # Фильтр по размеру — последним, после дешёвых строковых проверок.
+        # Размер берём у цели симлинка (в архив попадёт именно она); битые
+        # ссылки отбрасываем. Для обычных файлов на Windows размер уже есть в
+        # данных FindFirstFile, которые вернул scandir, — лишнего syscall нет.
+        if size_mode != "none":
+            try:
+                size = entry.stat().st_size
+            except OSError:
+                return False
+
+            if size_mode == "max" and size > size_limit_bytes:
+                return False
+            if size_mode == "min" and size < size_limit_bytes:
+                return False
+
+        return True
+
+    def walk_subtree(subdir: tuple[str, str]) -> list[str]:
+        path, rel_lower = subdir
+        return [
+            entry.path
+            for rel_dir_lower, entry in _walk_scandir(path, rel_lower, skip_dir)
+            if accept(rel_dir_lower, entry)
+        ]
 
-            files.append(full_path)
+    # Файлы в корне — сразу, а поддеревья верхнего уровня обходим параллельно:
+    # обход упирается в системные вызовы (GIL на них отпускается).
+    # map() сохраняет порядок, поэтому результат тот же, что и при
+    # последовательном обходе.
+    root_entries, top_subdirs = _scan_dir(project_root, "", skip_dir)
+    files.extend(entry.path for entry in root_entries if accept("", entry))
+
+    if len(top_subdirs) > 1:
+        with ThreadPoolExecutor(max_workers=SCAN_WORKERS) as ex:
+            for sub_files in ex.map(walk_subtree, top_subdirs):
+                files.extend(sub_files)
+    else:
+        for subdir in top_subdirs:
+            files.extend(walk_subtree(subdir))
 
     return files
 
 
-def build_archive_name(backup_dir: str, include_time: bool) -> str:
+def build_archive_name(
+    backup_dir: str,
+    include_time: bool,
+    version_cache: dict | None = None,
+) -> str:
     """
     Строим имя архива с датой/временем и версией.
 
@@ -205,7 +385,22 @@ def build_archive_name(backup_dir: str, include_time: bool) -> str:
       с временем:   HH-MM-SS_DD-MM-YYYY.rar
       без времени:  DD-MM-YYYY.rar
       при совпадении: ..._v1.rar, ..._v2.rar и т.д.
+
+    version_cache — необязательный dict {(backup_dir, base): следующая_версия}.
+    Если для base версия уже известна, папку бэкапов заново не перечисляем,
+    а только проверяем, что выбранное имя свободно. Сам кэш здесь не
+    меняется: версию фиксирует create_rar_archive после успешного rar
+    (см. _plan_archive_name), чтобы неудачный запуск не «съедал» номер.
     """
+    return _plan_archive_name(backup_dir, include_time, version_cache)[0]
+
+
+def _plan_archive_name(
+    backup_dir: str,
+    include_time: bool,
+    version_cache: dict | None = None,
+) -> tuple[str, tuple[str, str], int]:
+    """-> (путь_к_архиву, ключ_кэша_версий, следующая_версия_для_кэша)."""
     now = datetime.now()
     date_str = now.strftime("%d-%m-%Y")
 
@@ -215,36 +410,140 @@ def build_archive_name(backup_dir: str, include_time: bool) -> str:
     else:
         base = date_str
 
-    existing = [
-        f for f in os.listdir(backup_dir)
-        if f.startswith(base) and f.lower().endswith(".rar")
-    ]
+    key = (os.path.abspath(backup_dir), base)
 
-    if not existing:
-        return os.path.join(backup_dir, base + ".rar")
+    if version_cache is not None and key in version_cache:
+        new_v = version_cache[key]
+        while os.path.exists(os.path.join(backup_dir, f"{base}_v{new_v}.rar")):
+            new_v += 1
+        return os.path.join(backup_dir, f"{base}_v{new_v}.rar"), key, new_v + 1
 
+    has_existing = False
     max_v = 0
-    pattern = re.compile(re.escape(base) + r"_v(\d+)\.rar$", re.IGNORECASE)
-    for fname in existing:
-        m = pattern.match(fname)
-        if m:
-            try:
+    base_len = len(base)
+    with os.scandir(backup_dir) as it:
+        for entry in it:
+            fname = entry.name
+            if not fname.startswith(base) or not fname.lower().endswith(".rar"):
+                continue
+            has_existing = True
+
+            m = _ARCHIVE_VERSION_RE.fullmatch(fname, base_len)
+            if m:
                 num = int(m.group(1))
                 if num > max_v:
                     max_v = num
-            except ValueError:
-                pass
 
-    new_v = max_v + 1 if max_v > 0 else 1
-    return os.path.join(backup_dir, f"{base}_v{new_v}.rar")
+    if not has_existing:
+        return os.path.join(backup_dir, base + ".rar"), key, 1
+
+    new_v = max_v + 1
+    return os.path.join(backup_dir, f"{base}_v{new_v}.rar"), key, new_v + 1
+
+
+def _run_rar(cmd: list[str], cwd: str, on_output=None) -> tuple[int, str]:
+    """Запускает rar, построчно отдавая вывод в on_output. -> (код, вывод)."""
+    output_lines: list[str] = []
+    with subprocess.Popen(
+        cmd,
+        cwd=cwd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+    ) as proc:
+        for line in proc.stdout:
+            line = line.rstrip("\r\n")
+            output_lines.append(line)
+            if on_output is not None:
+                on_output(line)
+    return proc.returncode, "\n".join(output_lines)
+
+
+def build_rar_selection_switches(
+    include_exts: set[str],
+    exclude_patterns: set[str],
+    backup_dir_rel: str,
+    name_prefix: str = "",
+    skip_root_dirs: list[str] | None = None,
+) -> list[str]:
+    """
+    Ключи rar для отбора файлов самим rar (без предварительного сканирования).
+
+    Паттерн p (подстрока, без учёта регистра) превращается в две маски:
+      -x*p*              — p в имени файла (маска без слеша сравнивается с именем)
+      -x<prefix>*p*\\*    — p в пути каталога ('*' в масках с путём захватывает
+                           и слеши)
+    name_prefix — папка проекта в путях rar (keep_root_dir, "project\\"): маски
+    с путём привязаны к ней, чтобы паттерн не срабатывал на имя самого проекта
+    (проект "catalogs" и паттерн "logs").
+    Папка бэкапов и skip_root_dirs (папки *backup в корне — их пропускает и
+    collect_files_for_backup) исключаются отдельно.
+
+    Расширения передаются с точкой (-n*.py), иначе под маску попал бы и файл
+    без расширения вроде "happy". Символы * ? [ в паттернах rar считает
+    подстановочными — такие паттерны сюда не передаём (см.
+    patterns_need_scan). На Windows rar сравнивает маски без учёта регистра,
+    на других системах — с учётом, так что там отбор может расходиться со
+    сканированием по регистру имён.
+    """
+    switches = ["-r"]
+
+    for ext in sorted(include_exts):
+        ext = ext.strip().lstrip(".").lower()
+        if ext:
+            switches.append(f"-n*.{ext}")
+
+    for p in sorted(exclude_patterns):
+        p = p.strip().lower().replace("/", os.sep)
+        if not p:
+            continue
+        switches.append(f"-x*{p}*")
+        switches.append(f"-x{name_prefix}*{p}*{os.sep}*")
+
+    switches.append(f"-x{backup_dir_rel}{os.sep}*")
+    for name in skip_root_dirs or ():
+        switches.append(f"-x{name_prefix}{name}{os.sep}*")
+    return switches
+
+
+def patterns_need_scan(exclude_patterns: set[str]) -> bool:
+    """
+    True, если среди паттернов есть символы * ? [ — в ключах rar они стали бы
+    подстановочными, а сканирование ищет их как обычную подстроку.
+    """
+    return any(ch in p for p in exclude_patterns for ch in "*?[")
+
+
+def list_root_backup_dirs(project_root: str) -> list[str]:
+    """Папки в корне проекта, которые считаются папками бэкапов (*backup)."""
+    names = []
+    try:
+        with os.scandir(project_root) as it:
+            for entry in it:
+                try:
+                    if not entry.is_dir() or entry.is_symlink():
+                        continue
+                except OSError:
+                    continue
+                if normalize_backup_name(entry.name).endswith("backup"):
+                    names.append(entry.name)
+    except OSError:
+        pass
+    return sorted(names)
 
 
 def create_rar_archive(
     project_root: str,
     backup_dir: str,
-    files: list[str],
+    files: list[str] | None,
     include_time: bool,
     keep_root_dir: bool = True,
+    compression_level: int = DEFAULT_COMPRESSION_LEVEL,
+    threads: int = DEFAULT_RAR_THREADS,
+    on_output=None,
+    version_cache: dict | None = None,
+    include_exts: set[str] | None = None,
+    exclude_patterns: set[str] | None = None,
 ) -> tuple[str, str]:
     """
     Создаёт RAR-архив через внешнюю программу `rar`.
@@ -254,9 +553,23 @@ def create_rar_archive(
         внутри архива будет папка с именем проекта, например:
         ai_trader/cli/dataset.py
 
+    compression_level — уровень сжатия rar (0..5), threads — число потоков (-mt).
+
+    on_output(line) — если задан, вызывается на каждую строку вывода rar
+    по мере его работы (для живого лога).
+
+    version_cache — кэш версий имён архивов (см. build_archive_name).
+
+    files = None — файлы отбирает сам rar (-r, -n/-x из include_exts и
+    exclude_patterns), дерево проекта обходится один раз, внутри rar.
+    Фильтр по размеру в этом режиме недоступен. Если под маски ничего
+    не попало — NothingToBackupError.
+
     Требуется установленный rar.exe / WinRAR в PATH.
     """
-    archive_path = build_archive_name(backup_dir, include_time)
+    archive_path, version_key, next_version = _plan_archive_name(
+        backup_dir, include_time, version_cache
+    )
 
     project_root = os.path.abspath(project_root)
     backup_dir = os.path.abspath(backup_dir)
@@ -268,42 +581,191 @@ def create_rar_archive(
 
         # путь к архиву относительно родителя
         archive_rel_path = os.path.relpath(archive_path, parent_dir)
-
-        # файлы с префиксом имени проекта
-        rel_files = [
-            os.path.join(project_name, os.path.relpath(f, project_root))
-            for f in files
-        ]
+        name_prefix = project_name + os.sep
         cmd_cwd = parent_dir
     else:
         # архив создаём по абсолютному пути, файлы относительно project_root
         archive_rel_path = archive_path
-        rel_files = [os.path.relpath(f, project_root) for f in files]
+        name_prefix = ""
         cmd_cwd = project_root
 
-    cmd = ["rar", "a", archive_rel_path] + rel_files
+    base_cmd = [
+        "rar", "a",
+        f"-m{compression_level}",
+        f"-mt{threads}",
+    ]
 
-    result = subprocess.run(
-        cmd,
-        cwd=cmd_cwd,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        text=True,
-    )
+    if files is None:
+        # Отбор файлов силами rar: один обход дерева, в native-коде rar
+        backup_dir_rel = os.path.relpath(backup_dir, cmd_cwd)
+        cmd = base_cmd + build_rar_selection_switches(
+            include_exts or set(),
+            exclude_patterns or set(),
+            backup_dir_rel,
+            name_prefix=name_prefix,
+            skip_root_dirs=list_root_backup_dirs(project_root),
+        )
+        cmd += [archive_rel_path, name_prefix + "*"]
+        returncode, output = _run_rar(cmd, cmd_cwd, on_output)
+
+        if returncode == RAR_EXIT_NO_FILES:
+            raise NothingToBackupError(output)
+    else:
+        # Все файлы пришли из collect_files_for_backup и начинаются с project_root,
+        # поэтому вместо os.path.relpath на каждый файл достаточно среза строки
+        prefix = os.path.join(project_root, "")
+        prefix_len = len(prefix)
+        rel_files = [
+            name_prefix + (
+                f[prefix_len:] if f.startswith(prefix)
+                else os.path.relpath(f, project_root)
+            )
+            for f in files
+        ]
 
-    if result.returncode != 0:
+        # Список файлов передаём через list-файл (@listfile), а не в argv:
+        # командная строка Windows ограничена ~32 КБ, а файлов может быть тысячи.
+        # -scfl — list-файл в UTF-8 (в путях бывают не-ASCII символы).
+        fd, list_path = tempfile.mkstemp(prefix="rar_list_", suffix=".lst")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8", newline="\n") as f:
+                f.write("\n".join(rel_files))
+                f.write("\n")
+
+            cmd = base_cmd + ["-scfl", archive_rel_path, "@" + list_path]
+            returncode, output = _run_rar(cmd, cmd_cwd, on_output)
+        finally:
+            try:
+                os.remove(list_path)
+            except OSError:
+                pass
+
+    if returncode != 0:
         raise RuntimeError(
-            f"rar завершился с кодом {result.returncode}.\n\nВывод:\n{result.stdout}"
+            f"rar завершился с кодом {returncode}.\n\nВывод:\n{output}"
         )
 
     # Доп. проверка — действительно ли файл появился
     if not os.path.exists(archive_path):
         raise RuntimeError(
             "rar отработал без ошибок, но архив не найден по пути:\n"
-            f"{archive_path}\n\nПолный вывод rar:\n{result.stdout}"
+            f"{archive_path}\n\nПолный вывод rar:\n{output}"
         )
 
-    return archive_path, result.stdout
+    # Номер версии занят только теперь, когда архив действительно создан
+    if version_cache is not None:
+        version_cache[version_key] = next_version
+
+    return archive_path, output
+
+
+# ---------- Фоновая задача ----------
+
+class BackupWorker(QObject):
+    """
+    Сканирование проекта + запуск rar в отдельном потоке (QThread),
+    чтобы окно не зависало. Всё общение с GUI — только через сигналы.
+    """
+
+    progress = Signal(str)          # строка лога (в т.ч. вывод rar построчно)
+    finished = Signal(str)          # путь к готовому архиву
+    nothing_found = Signal()        # по правилам не найдено ни одного файла
+    error = Signal(str, str)        # заголовок, текст ошибки
+
+    def __init__(
+        self,
+        project_path: str,
+        include_exts: frozenset[str],
+        exclude_patterns: set[str],
+        size_mode: str,
+        size_limit_bytes: int,
+        include_time: bool,
+        keep_root_dir: bool,
+        compression_level: int,
+        threads: int,
+        version_cache: dict | None = None,
+        rar_selects_files: bool = False,
+    ):
+        super().__init__()
+        self.project_path = project_path
+        self.include_exts = include_exts
+        self.exclude_patterns = exclude_patterns
+        self.size_mode = size_mode
+        self.size_limit_bytes = size_limit_bytes
+        self.include_time = include_time
+        self.keep_root_dir = keep_root_dir
+        self.compression_level = compression_level
+        self.threads = threads
+        self.version_cache = version_cache
+        # отбор файлов силами rar возможен только без фильтра по размеру
+        # и без символов * ? [ в паттернах
+        self.rar_selects_files = (
+            rar_selects_files
+            and size_mode == "none"
+            and not patterns_need_scan(exclude_patterns)
+        )
+
+    def run(self):
+        try:
+            if self.rar_selects_files:
+                # Дерево обойдёт сам rar — без второго прохода в Python
+                self.progress.emit("Файлы отбирает rar (без предварительного сканирования)...")
+                files = None
+            else:
+                # Сканируем проект
+                self.progress.emit("Сканирование проекта...")
+                files = collect_files_for_backup(
+                    project_root=self.project_path,
+                    include_exts=self.include_exts,
+                    exclude_patterns=self.exclude_patterns,
+                    size_mode=self.size_mode,
+                    size_limit_bytes=self.size_limit_bytes,
+                )
+
+                if not files:
+                    self.progress.emit("Файлы не найдены.")
+                    self.nothing_found.emit()
+                    return
+
+                self.progress.emit(f"Файлов для бэкапа: {len(files)}")
+
+            # Папка бэкапов
+            backup_dir = get_or_create_backup_dir(self.project_path)
+            self.progress.emit(f"Папка для бэкапов: {backup_dir}")
+
+            # Создаём RAR, вывод rar идёт в лог по мере работы
+            self.progress.emit(
+                "Создание RAR-архива (нужен установленный rar.exe / WinRAR в PATH)..."
+            )
+            archive_path, _output = create_rar_archive(
+                project_root=self.project_path,
+                backup_dir=backup_dir,
+                files=files,
+                include_time=self.include_time,
+                keep_root_dir=self.keep_root_dir,
+                compression_level=self.compression_level,
+                threads=self.threads,
+                on_output=self.progress.emit,
+                version_cache=self.version_cache,
+                include_exts=self.include_exts,
+                exclude_patterns=self.exclude_patterns,
+            )
+            self.progress.emit(f"Готово! Архив: {archive_path}")
+            self.finished.emit(archive_path)
+        except NothingToBackupError:
+            self.progress.emit("Файлы не найдены.")
+            self.nothing_found.emit()
+        except FileNotFoundError:
+            self.progress.emit("Ошибка: rar.exe не найден.")
+            self.error.emit(
+                "rar не найден",
+                "Не удалось запустить 'rar'.\n"
+                "Установи WinRAR / RAR и добавь его в PATH, "
+                "или положи rar.exe в одну папку со скриптом.",
+            )
+        except Exception as e:
+            self.progress.emit(f"Ошибка: {e}")
+            self.error.emit("Ошибка при создании архива", str(e))
 
 
 # ---------- Главное окно ----------
@@ -315,13 +777,46 @@ class BackupWindow(QMainWindow):
         self.resize(900, 600)
 
         self.ext_checkboxes: dict[str, QCheckBox] = {}
+        # включённые расширения, всегда в актуальном состоянии (через toggled)
+        self._enabled_exts: set[str] = set()
         self.config_path: Path = get_config_path()
 
+        self._backup_thread: QThread | None = None
+        self._backup_worker: BackupWorker | None = None
+        # кэш версий имён архивов на время сессии (см. build_archive_name)
+        self._archive_versions: dict = {}
+
+        # Автосохранение: изменения виджетов копятся и пишутся одним разом
+        self._save_timer = QTimer(self)
+        self._save_timer.setSingleShot(True)
+        self._save_timer.setInterval(SETTINGS_AUTOSAVE_MS)
+        self._save_timer.timeout.connect(self._autosave_settings)
+
+        # Лог копится в буфере и добавляется в виджет пачкой
+        self._log_buffer: list[str] = []
+        self._log_timer = QTimer(self)
+        self._log_timer.setSingleShot(True)
+        self._log_timer.setInterval(LOG_FLUSH_MS)
+        self._log_timer.timeout.connect(self._flush_log)
+
         self._init_ui()
         self.load_settings()
+        self._connect_autosave()
 
     # ----- UI -----
 
+    def _connect_autosave(self):
+        for cb in self.ext_checkboxes.values():
+            cb.stateChanged.connect(self._schedule_save)
+        self.exclude_patterns_edit.textChanged.connect(self._schedule_save)
+        self.size_mode_combo.currentIndexChanged.connect(self._schedule_save)
+        self.size_spin.valueChanged.connect(self._schedule_save)
+        self.include_time_checkbox.stateChanged.connect(self._schedule_save)
+        self.keep_root_dir_checkbox.stateChanged.connect(self._schedule_save)
+        self.rar_selects_files_checkbox.stateChanged.connect(self._schedule_save)
+        self.compression_spin.valueChanged.connect(self._schedule_save)
+        self.threads_spin.valueChanged.connect(self._schedule_save)
+
     def _init_ui(self):
         central = QWidget()
         self.setCentralWidget(central)
@@ -377,9 +872,7 @@ class BackupWindow(QMainWindow):
 
         # Чекбоксы для расширений по умолчанию
         for ext in DEFAULT_EXTENSIONS:
-            cb = QCheckBox(ext)
-            cb.setChecked(True)
-            self.ext_checkboxes[ext] = cb
+            cb = self._new_ext_checkbox(ext)
             inner_layout.addWidget(cb)
 
         inner_layout.addStretch(1)
@@ -400,6 +893,18 @@ class BackupWindow(QMainWindow):
 
         self.tabs.addTab(tab, "Типы файлов")
 
+    def _new_ext_checkbox(self, ext: str) -> QCheckBox:
+        """Создаёт включённый чекбокс расширения (в layout не добавляет)."""
+        cb = QCheckBox(ext)
+        cb.toggled.connect(
+            lambda checked, e=ext: (
+                self._enabled_exts.add(e) if checked else self._enabled_exts.discard(e)
+            )
+        )
+        cb.setChecked(True)
+        self.ext_checkboxes[ext] = cb
+        return cb
+
     def _init_excludes_tab(self):
         tab = QWidget()
         layout = QVBoxLayout(tab)
@@ -472,6 +977,30 @@ class BackupWindow(QMainWindow):
         self.keep_root_dir_checkbox.setChecked(True)
         layout.addWidget(self.keep_root_dir_checkbox)
 
+        self.rar_selects_files_checkbox = QCheckBox(
+            "Отбирать файлы силами rar (быстрее на больших проектах; "
+            "без фильтра по размеру)"
+        )
+        self.rar_selects_files_checkbox.setChecked(False)
+        layout.addWidget(self.rar_selects_files_checkbox)
+
+        rar_layout = QHBoxLayout()
+
+        self.compression_spin = QSpinBox()
+        self.compression_spin.setRange(0, 5)
+        self.compression_spin.setValue(DEFAULT_COMPRESSION_LEVEL)
+
+        self.threads_spin = QSpinBox()
+        self.threads_spin.setRange(1, 64)
+        self.threads_spin.setValue(DEFAULT_RAR_THREADS)
+
+        rar_layout.addWidget(QLabel("Уровень сжатия (0-5):"))
+        rar_layout.addWidget(self.compression_spin)
+        rar_layout.addWidget(QLabel("Потоки:"))
+        rar_layout.addWidget(self.threads_spin)
+        rar_layout.addStretch(1)
+        layout.addLayout(rar_layout)
+
         btn_layout = QHBoxLayout()
         save_btn = QPushButton("Сохранить настройки сейчас")
         reset_btn = QPushButton("Сбросить настройки по умолчанию")
@@ -490,10 +1019,24 @@ class BackupWindow(QMainWindow):
     # ----- Лог / события окна -----
 
     def log(self, text: str):
-        self.log_edit.appendPlainText(text)
+        self._log_buffer.append(text)
+        if not self._log_timer.isActive():
+            self._log_timer.start()
+
+    def _flush_log(self):
+        if not self._log_buffer:
+            return
+        # одна вставка на пачку строк вместо перекладки документа на каждую
+        self.log_edit.appendPlainText("\n".join(self._log_buffer))
+        self._log_buffer.clear()
 
     def closeEvent(self, event):
-        # Автосохранение настроек при закрытии
+        # Дожидаемся фонового бэкапа, иначе rar оборвётся вместе с окном
+        if self._backup_thread is not None and self._backup_thread.isRunning():
+            self._backup_thread.wait()
+
+        # Автосохранение настроек при закрытии (финальный сброс на диск)
+        self._save_timer.stop()
         try:
             self.save_settings()
         except Exception as e:
@@ -523,9 +1066,8 @@ class BackupWindow(QMainWindow):
             QMessageBox.information(self, "Инфо", f"Расширение {ext} уже есть в списке.")
             return
 
-        cb = QCheckBox(ext)
-        cb.setChecked(True)
-        self.ext_checkboxes[ext] = cb
+        cb = self._new_ext_checkbox(ext)
+        cb.stateChanged.connect(self._schedule_save)
 
         # Добавляем в конец списка чекбоксов во вкладке "Типы файлов"
         ext_tab = self.tabs.widget(0)
@@ -535,6 +1077,7 @@ class BackupWindow(QMainWindow):
         inner_layout.insertWidget(inner_layout.count() - 1, cb)
 
         self.custom_ext_edit.clear()
+        self._schedule_save()
 
     def on_backup_clicked(self):
         project_path = self.project_edit.text().strip()
@@ -544,10 +1087,7 @@ class BackupWindow(QMainWindow):
             return
 
         # Собираем расширения
-        include_exts = {
-            ext for ext, cb in self.ext_checkboxes.items()
-            if cb.isChecked()
-        }
+        include_exts = frozenset(self._enabled_exts)
 
         if not include_exts:
             QMessageBox.critical(self, "Ошибка", "Не выбрано ни одного типа файла.")
@@ -574,69 +1114,71 @@ class BackupWindow(QMainWindow):
 
         include_time = self.include_time_checkbox.isChecked()
         keep_root_dir = self.keep_root_dir_checkbox.isChecked()
+        compression_level = self.compression_spin.value()
+        threads = self.threads_spin.value()
+        rar_selects_files = self.rar_selects_files_checkbox.isChecked()
+
+        if rar_selects_files and size_mode != "none":
+            self.log("Фильтр по размеру включён — файлы отбираются сканированием.")
+        elif rar_selects_files and patterns_need_scan(exclude_patterns):
+            self.log("В паттернах есть символы * ? [ — файлы отбираются сканированием.")
 
         # Для отладки — смотрим, какие паттерны реально используются
         self.log(f"Исключения (паттерны): {sorted(exclude_patterns)}")
 
-        # Сканируем проект
-        self.log("Сканирование проекта...")
-        files = collect_files_for_backup(
-            project_root=project_path,
+        # Сканирование и rar — в фоновом потоке
+        self.backup_btn.setEnabled(False)
+
+        thread = QThread(self)
+        worker = BackupWorker(
+            project_path=project_path,
             include_exts=include_exts,
             exclude_patterns=exclude_patterns,
             size_mode=size_mode,
             size_limit_bytes=size_limit_bytes,
+            include_time=include_time,
+            keep_root_dir=keep_root_dir,
+            compression_level=compression_level,
+            threads=threads,
+            version_cache=self._archive_versions,
+            rar_selects_files=rar_selects_files,
         )
+        worker.moveToThread(thread)
 
-        if not files:
-            QMessageBox.warning(
-                self, "Ничего не найдено",
-                "По заданным правилам не найдено ни одного файла для бэкапа."
-            )
-            self.log("Файлы не найдены.")
-            return
+        thread.started.connect(worker.run)
+        worker.progress.connect(self.log)
+        worker.finished.connect(self.on_backup_finished)
+        worker.nothing_found.connect(self.on_backup_nothing_found)
+        worker.error.connect(self.on_backup_error)
 
-        self.log(f"Файлов для бэкапа: {len(files)}")
+        for sig in (worker.finished, worker.nothing_found, worker.error):
+            sig.connect(thread.quit)
+        thread.finished.connect(self.on_backup_thread_done)
 
-        # Папка бэкапов
-        backup_dir = get_or_create_backup_dir(project_path)
-        self.log(f"Папка для бэкапов: {backup_dir}")
+        self._backup_thread = thread
+        self._backup_worker = worker
+        thread.start()
 
-        # Сохраняем настройки
-        self.save_settings()
+    def on_backup_finished(self, archive_path: str):
+        QMessageBox.information(self, "Готово", f"Бэкап создан:\n{archive_path}")
 
-        # Создаём RAR
-        try:
-            self.backup_btn.setEnabled(False)
-            self.log("Создание RAR-архива (нужен установленный rar.exe / WinRAR в PATH)...")
-            archive_path, output = create_rar_archive(
-                project_root=project_path,
-                backup_dir=backup_dir,
-                files=files,
-                include_time=include_time,
-                keep_root_dir=keep_root_dir,
-            )
-            self.log(output)
-            self.log(f"Готово! Архив: {archive_path}")
-            QMessageBox.information(self, "Готово", f"Бэкап создан:\n{archive_path}")
-        except FileNotFoundError:
-            QMessageBox.critical(
-                self,
-                "rar не найден",
-                "Не удалось запустить 'rar'.\n"
-                "Установи WinRAR / RAR и добавь его в PATH, "
-                "или положи rar.exe в одну папку со скриптом.",
-            )
-            self.log("Ошибка: rar.exe не найден.")
-        except Exception as e:
-            QMessageBox.critical(
-                self,
-                "Ошибка при создании архива",
-                str(e)
-            )
-            self.log(f"Ошибка: {e}")
-        finally:
-            self.backup_btn.setEnabled(True)
+    def on_backup_nothing_found(self):
+        QMessageBox.warning(
+            self, "Ничего не найдено",
+            "По заданным правилам не найдено ни одного файла для бэкапа."
+        )
+
+    def on_backup_error(self, title: str, text: str):
+        QMessageBox.critical(self, title, text)
+
+    def on_backup_thread_done(self):
+        if self._backup_worker is not None:
+            self._backup_worker.deleteLater()
+        if self._backup_thread is not None:
+            self._backup_thread.deleteLater()
+        self._backup_worker = None
+        self._backup_thread = None
+        self.backup_btn.setEnabled(True)
 
     # ----- Работа с настройками -----
 
@@ -650,6 +1192,9 @@ class BackupWindow(QMainWindow):
         self.size_spin.setValue(50)
         self.include_time_checkbox.setChecked(True)
         self.keep_root_dir_checkbox.setChecked(True)
+        self.rar_selects_files_checkbox.setChecked(False)
+        self.compression_spin.setValue(DEFAULT_COMPRESSION_LEVEL)
+        self.threads_spin.setValue(DEFAULT_RAR_THREADS)
 
     def load_settings(self):
         if not self.config_path.exists():
@@ -657,8 +1202,7 @@ class BackupWindow(QMainWindow):
             return
 
         try:
-            with self.config_path.open("r", encoding="utf-8") as f:
-                data = json.load(f)
+            data = load_settings_json(self.config_path.read_bytes())
         except Exception as e:
             self.log(f"Не удалось загрузить настройки: {e}")
             self.apply_default_settings()
@@ -677,9 +1221,7 @@ class BackupWindow(QMainWindow):
                 if not e.startswith("."):
                     e = "." + e
                 if e not in self.ext_checkboxes:
-                    cb = QCheckBox(e)
-                    cb.setChecked(True)
-                    self.ext_checkboxes[e] = cb
+                    cb = self._new_ext_checkbox(e)
                     ext_tab = self.tabs.widget(0)
                     scroll: QScrollArea = ext_tab.findChild(QScrollArea)
                     inner = scroll.widget()
@@ -733,8 +1275,22 @@ class BackupWindow(QMainWindow):
         self.size_spin.setValue(int(data.get("size_limit_mb", 50)))
         self.include_time_checkbox.setChecked(bool(data.get("include_time", True)))
         self.keep_root_dir_checkbox.setChecked(bool(data.get("keep_root_dir", True)))
+        self.rar_selects_files_checkbox.setChecked(
+            bool(data.get("rar_selects_files", False))
+        )
+        self.compression_spin.setValue(
+            int(data.get("compression_level", DEFAULT_COMPRESSION_LEVEL))
+        )
+        self.threads_spin.setValue(int(data.get("rar_threads", DEFAULT_RAR_THREADS)))
+
+    def _schedule_save(self, *_args):
+        # перезапуск таймера: пишем только после паузы в изменениях
+        self._save_timer.start()
+
+    def _autosave_settings(self):
+        self.save_settings(quiet=True)
 
-    def save_settings(self):
+    def save_settings(self, quiet: bool = False):
         data: dict = {}
 
         data["extensions_all"] = list(self.ext_checkboxes.keys())
@@ -761,16 +1317,20 @@ class BackupWindow(QMainWindow):
 
         data["include_time"] = self.include_time_checkbox.isChecked()
         data["keep_root_dir"] = self.keep_root_dir_checkbox.isChecked()
+        data["rar_selects_files"] = self.rar_selects_files_checkbox.isChecked()
+        data["compression_level"] = self.compression_spin.value()
+        data["rar_threads"] = self.threads_spin.value()
 
         try:
             self.config_path.parent.mkdir(parents=True, exist_ok=True)
-            with self.config_path.open("w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            self.log(f"Настройки сохранены: {self.config_path}")
+            self.config_path.write_bytes(dump_settings_json(data))
+            if not quiet:
+                self.log(f"Настройки сохранены: {self.config_path}")
         except Exception as e:
             self.log(f"Не удалось сохранить настройки: {e}")
 
     def on_save_settings_clicked(self):
+        self._save_timer.stop()
         self.save_settings()
         QMessageBox.information(self, "Настройки", "Настройки сохранены.")
 
@@ -782,6 +1342,8 @@ class BackupWindow(QMainWindow):
             self.log(f"Не удалось удалить файл настроек: {e}")
 
         self.apply_default_settings()
+        # сброс не должен тут же записать конфиг обратно
+        self._save_timer.stop()
         self.log("Настройки сброшены к значениям по умолчанию.")
         QMessageBox.information(self, "Настройки", "Сброшено к значениям по умолчанию.")
 
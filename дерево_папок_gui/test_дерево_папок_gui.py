@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+Тесты масок исключений и построения дерева (без запуска окна).
+
+Нужен PySide6, иначе тесты пропускаются.
+Запуск:
+    python -m pytest дерево_папок_gui
+"""
+import importlib.util
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("PySide6")
+
+_SCRIPT = os.path.join(os.path.dirname(__file__), "дерево_папок_gui.py")
+_spec = importlib.util.spec_from_file_location("tree_gui", _SCRIPT)
+tree_gui = importlib.util.module_from_spec(_spec)
+sys.modules["tree_gui"] = tree_gui
+_spec.loader.exec_module(tree_gui)
+
+
+@pytest.mark.parametrize(
+    "mask, name, rel_path, skipped",
+    [
+        ("a*c", "c", "a/b/c", True),        # маска без слеша — и по пути
+        ("a*c", "b", "a/b", False),
+        (".git", ".git", "x/.git", True),   # буквальная — по имени
+        ("x/y", "y", "x/y", True),          # со слешем — по пути
+        ("x/y", "y", "z/y", False),
+        ("**/cache", "cache", "p/q/cache", True),
+    ],
+)
+def test_should_skip_dir(mask, name, rel_path, skipped):
+    masks = tree_gui._compile_exclude([mask])
+    rel_path = rel_path.replace("/", os.sep)
+    assert tree_gui._should_skip_dir(name, rel_path, masks) is skipped
+
+
+def test_slashless_mask_skips_nested_dir(tmp_path):
+    (tmp_path / "a" / "b" / "c" / "deep").mkdir(parents=True)
+    (tmp_path / "a" / "b" / "keep").mkdir()
+    options = tree_gui.WalkOptions(exclude=["a*c"], max_depth=0, ignore_hidden=True, follow_symlinks=False)
+
+    lines = list(tree_gui.build_tree(str(tmp_path), options))
+
+    assert any(line.endswith(" keep") for line in lines)
+    assert not any(line.endswith(" c") or line.endswith(" deep") for line in lines)
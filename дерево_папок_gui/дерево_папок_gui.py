@@ -12,12 +12,16 @@
     pip install PySide6
 """
 import os
+import re
 import sys
 import fnmatch
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Iterable, List, Optional, Sequence, Set
+from operator import attrgetter
+from typing import Iterable, Iterator, Optional, Sequence
 
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, QObject, QThread, Signal
 from PySide6.QtWidgets import (
     QApplication, QCheckBox, QGridLayout, QHBoxLayout, QLabel, QLineEdit,
     QMainWindow, QPushButton, QPlainTextEdit, QSizePolicy, QSpinBox,
@@ -30,6 +34,15 @@ TREE_SPACE = "   "
 TREE_T = "┝"      # оставим стиль исходного скрипта
 TREE_L = "└"
 
+# Потоки для параллельного чтения каталогов (GIL отпускается на readdir/stat)
+WALK_WORKERS = 16
+
+# Сколько каталогов можно прочитать вперёд вывода (ограничивает память)
+WALK_LOOKAHEAD = WALK_WORKERS * 4
+
+# Сколько строк дерева отправлять в окно за одну вставку
+OUTPUT_BATCH_LINES = 1000
+
 
 @dataclass(frozen=True)
 class WalkOptions:
@@ -43,88 +56,261 @@ def _is_hidden(name: str) -> bool:
     return name.startswith(".")
 
 
-def _compile_exclude(patterns: Iterable[str]) -> Set[str]:
-    """Подготовка множества масок (без пустых строк), обрезаем пробелы."""
-    cleaned = set()
-    for p in patterns:
-        p = p.strip()
-        if p:
-            cleaned.add(p)
-    return cleaned
+@dataclass(frozen=True)
+class ExcludeMasks:
+    """Скомпилированные маски исключений (None — масок этого вида нет)."""
+    name: Optional[re.Pattern] = None   # маски без разделителя пути — по имени
+    path: Optional[re.Pattern] = None   # маски, способные совпасть с rel_path
 
 
-def _should_skip_dir(dir_name: str, rel_path: str, masks: Set[str]) -> bool:
+def _union_regex(masks: Iterable[str]) -> Optional[re.Pattern]:
+    masks = sorted(masks)
+    if not masks:
+        return None
+    return re.compile("|".join(f"(?:{fnmatch.translate(p)})" for p in masks))
+
+
+def _compile_exclude(patterns: Iterable[str]) -> ExcludeMasks:
+    """Сборка масок (без пустых строк, пробелы обрезаем) в регулярки.
+
+    Каждая маска переводится fnmatch.translate, маски одного вида
+    объединяются через «|» — на элемент один вызов regex вместо перебора.
+    Как и раньше, каталог пропускается, если маска совпала с его именем
+    или с относительным путём. По rel_path проверяются только маски,
+    которые могут совпасть с ним иначе, чем с именем: со слешем, с «**»
+    или с любыми шаблонными символами (* ? [ — в fnmatch «*» захватывает
+    и «/», так что «a*c» исключает «a/b/c»). Буквальные маски без слеша
+    (.git, __pycache__, node_modules) — только по имени.
+    Регистр/слеши нормализуются как в fnmatch.fnmatch (os.path.normcase).
+    """
+    name_masks = set()
+    path_masks = set()
+    for p in patterns:
+        p = p.strip()
+        if not p:
+            continue
+        p = os.path.normcase(p)
+        has_sep = "/" in p or os.sep in p
+        if not has_sep:
+            name_masks.add(p)
+        if has_sep or "**" in p or any(ch in p for ch in "*?["):
+            path_masks.add(p)
+    return ExcludeMasks(name=_union_regex(name_masks), path=_union_regex(path_masks))
+
+
+def _should_skip_dir(dir_name: str, rel_path: str, masks: ExcludeMasks) -> bool:
     """Проверка, нужно ли пропустить каталог по маскам.
-    Совпадение проверяется по имени каталога и по относительному пути.
+    Имя каталога — по маскам имён, относительный путь — по маскам путей.
     """
-    if not masks:
-        return False
-    for pat in masks:
-        if fnmatch.fnmatch(dir_name, pat) or fnmatch.fnmatch(rel_path, pat):
-            return True
+    if masks.name is not None and masks.name.match(os.path.normcase(dir_name)):
+        return True
+    if masks.path is not None and masks.path.match(os.path.normcase(rel_path)):
+        return True
     return False
 
 
-def build_tree(root: str, options: Optional[WalkOptions] = None) -> List[str]:
-    """Строит строки дерева для каталога root с учётом настроек options."""
-    if options is None:
-        options = WalkOptions()
-    exclude_masks = _compile_exclude(options.exclude)
+def _dir_key(entry: os.DirEntry) -> Optional[tuple]:
+    """(st_dev, st_ino) каталога, на который указывает entry (через симлинки)."""
+    try:
+        # Цель ссылки нужна только для симлинка; обычный каталог берём
+        # из кэша DirEntry без лишнего stat по пути
+        if entry.is_symlink():
+            st = entry.stat()
+        else:
+            st = entry.stat(follow_symlinks=False)
+        if not st.st_ino:
+            # на Windows DirEntry.stat() не заполняет st_ino/st_dev
+            st = os.stat(entry.path)
+    except OSError:
+        return None
+    return st.st_dev, st.st_ino
 
-    lines: List[str] = []
-    base = os.path.basename(os.path.abspath(root)) or root
-    lines.append(base)
 
-    def walk(path: str, prefix: str, depth: int, rel: str):
+def _list_dir(path: str, rel: str, options: WalkOptions, masks: ExcludeMasks):
+    """Читает один каталог: (ошибка или None, [(имя, DirEntry, в_глубь, rel), ...]).
+
+    Элементы отсортированы по имени и уже отфильтрованы (скрытые, маски).
+    """
+    try:
+        # Сортируем сами DirEntry по имени — без отдельного списка имён
+        with os.scandir(path) as it:
+            entries = sorted(it, key=attrgetter("name"))
+    except PermissionError:
+        return "[доступ запрещён]", []
+    except FileNotFoundError:
+        return "[не найдено]", []
+
+    children = []
+    for entry in entries:
+        name = entry.name
+        if options.ignore_hidden and _is_hidden(name):
+            continue
+
+        # Тип берём из DirEntry (d_type/FindFirstFile) — без лишних stat,
+        # ровно один раз: он же решает и фильтрацию, и рекурсию.
+        # is_dir() следует симлинкам, как и прежний os.path.isdir.
         try:
-            entries = sorted(os.listdir(path))
-        except PermissionError:
-            lines.append(f"{prefix}{TREE_T} [доступ запрещён]")
-            return
-        except FileNotFoundError:
-            lines.append(f"{prefix}{TREE_T} [не найдено]")
-            return
+            is_dir = entry.is_dir()
+        except OSError:
+            is_dir = False
 
-        # Фильтруем элементы
-        filtered = []
-        for name in entries:
-            if options.ignore_hidden and _is_hidden(name):
+        descend = False
+        rel_child = ""
+        if is_dir:
+            # Если это каталог, проверим исключения по маскам
+            rel_child = os.path.join(rel, name) if rel else name
+            if _should_skip_dir(name, rel_child, masks):
                 continue
-            full_path = os.path.join(path, name)
 
-            # Если это каталог, проверим исключения по маскам
-            if os.path.isdir(full_path):
-                rel_child = os.path.join(rel, name) if rel else name
-                if _should_skip_dir(name, rel_child, exclude_masks):
-                    continue
+            # симлинк интересен только для каталогов (следовать ли в него)
+            try:
+                is_link = entry.is_symlink()
+            except OSError:
+                is_link = False
+            descend = options.follow_symlinks or not is_link
+
+        children.append((name, entry, descend, rel_child))
 
-            filtered.append(name)
+    return None, children
 
-        count = len(filtered)
-        for index, name in enumerate(filtered):
-            full_path = os.path.join(path, name)
+
+def build_tree(root: str, options: Optional[WalkOptions] = None) -> Iterator[str]:
+    """Отдаёт строки дерева для каталога root с учётом настроек options.
+
+    Каталоги читаются параллельно пулом потоков (обход упирается в
+    readdir/stat, особенно на сетевых дисках), а строки собираются
+    в исходном порядке обхода в глубину. Строки отдаются генератором,
+    без промежуточного списка. Вперёд вывода читается не больше
+    WALK_LOOKAHEAD каталогов, так что память не растёт с размером дерева;
+    закрытый раньше времени генератор отменяет ещё не начатые чтения.
+    """
+    if options is None:
+        options = WalkOptions()
+    exclude_masks = _compile_exclude(options.exclude)
+
+    base = os.path.basename(os.path.abspath(root)) or root
+    yield base
+
+    def scan(path: str, depth: int, rel: str, ancestors: frozenset):
+        # Читаем один каталог; подкаталоги в пул ставит render.
+        # ancestors — (st_dev, st_ino) каталогов на пути от корня; нужны
+        # только при follow_symlinks, чтобы не зациклиться на ссылках.
+        error, children = _list_dir(path, rel, options, exclude_masks)
+
+        # На последнем разрешённом уровне подкаталоги не читаем вовсе:
+        # глубина проверяется до scandir, а не после входа в каталог
+        can_descend = not options.max_depth or depth < options.max_depth
+
+        result = []
+        for name, entry, descend, rel_child in children:
+            sub = None
+            if descend and can_descend:
+                sub_ancestors = ancestors
+                if options.follow_symlinks:
+                    # stat по DirEntry кэшируется — один вызов на каталог
+                    key = _dir_key(entry)
+                    if key in ancestors:
+                        result.append((f"{name} [цикл ссылок]", None))
+                        continue
+                    if key is not None:
+                        sub_ancestors = ancestors | {key}
+                # [аргументы scan, future] — future появится при отправке в пул
+                sub = [(entry.path, depth + 1, rel_child, sub_ancestors), None]
+            result.append((name, sub))
+        return error, result
+
+    pool = ThreadPoolExecutor(max_workers=WALK_WORKERS)
+    # Подкаталоги, ещё не отправленные в пул; слева — те, что понадобятся
+    # выводу раньше (дети текущего каталога ставятся в начало)
+    ahead: deque = deque()
+    pending: set = set()  # отправлены заранее и ещё не выведены
+
+    def top_up():
+        while ahead and len(pending) < WALK_LOOKAHEAD:
+            sub = ahead.popleft()
+            if sub[1] is None:
+                sub[1] = pool.submit(scan, *sub[0])
+                pending.add(sub[1])
+
+    def take(sub):
+        if sub[1] is None:
+            sub[1] = pool.submit(scan, *sub[0])
+        pending.discard(sub[1])
+        top_up()
+        return sub[1].result()
+
+    # Отступ храним стеком сегментов по 3 символа (push/pop на уровень),
+    # а строку отступа собираем один раз на каталог
+    prefix_stack: list[str] = []
+
+    def render(sub):
+        prefix = "".join(prefix_stack)
+        error, children = take(sub)
+        if error is not None:
+            yield f"{prefix}{TREE_T} {error}"
+            return
+
+        ahead.extendleft(reversed([child for _, child in children if child is not None]))
+        top_up()
+
+        count = len(children)
+        for index, (name, child) in enumerate(children):
             connector = TREE_L if index == count - 1 else TREE_T
-            lines.append(f"{prefix}{connector} {name}")
+            yield f"{prefix}{connector} {name}"
 
             # Погружаемся в каталоги
-            try:
-                is_dir = os.path.isdir(full_path)
-                is_link = os.path.islink(full_path)
-            except OSError:
-                is_dir = False
-                is_link = False
+            if child is not None:
+                prefix_stack.append(TREE_SPACE if index == count - 1 else TREE_VERT)
+                yield from render(child)
+                prefix_stack.pop()
+
+    root_ancestors = frozenset()
+    if options.follow_symlinks:
+        try:
+            st = os.stat(root)
+        except OSError:
+            pass
+        else:
+            root_ancestors = frozenset({(st.st_dev, st.st_ino)})
 
-            if is_dir:
-                if is_link and not options.follow_symlinks:
-                    continue
-                if options.max_depth and depth >= options.max_depth:
-                    continue
-                extension = TREE_SPACE if index == count - 1 else TREE_VERT
-                rel_next = os.path.join(rel, name) if rel else name
-                walk(full_path, prefix + extension, depth + 1, rel_next)
+    try:
+        yield from render([(root, 1, "", root_ancestors), None])
+    finally:
+        # При закрытии генератора не ждём остаток обхода
+        pool.shutdown(wait=False, cancel_futures=True)
 
-    walk(root, prefix="", depth=1, rel="")
-    return lines
+
+class TreeWorker(QObject):
+    """
+    Построение дерева в отдельном потоке (QThread), чтобы окно не зависало.
+    Строки уходят в GUI пачками по OUTPUT_BATCH_LINES через сигнал.
+    """
+
+    lines_batch = Signal(str)       # несколько строк дерева, склеенных через \n
+    finished = Signal()             # дерево построено целиком
+    error = Signal(str)             # текст ошибки
+
+    def __init__(self, root: str, options: WalkOptions):
+        super().__init__()
+        self.root = root
+        self.options = options
+
+    def run(self):
+        batch: list[str] = []
+        try:
+            for line in build_tree(self.root, self.options):
+                batch.append(line)
+                if len(batch) >= OUTPUT_BATCH_LINES:
+                    self.lines_batch.emit("\n".join(batch))
+                    batch.clear()
+        except Exception as e:
+            if batch:
+                self.lines_batch.emit("\n".join(batch))
+            self.error.emit(str(e))
+            return
+        if batch:
+            self.lines_batch.emit("\n".join(batch))
+        self.finished.emit()
 
 
 class MainWindow(QMainWindow):
@@ -132,6 +318,8 @@ class MainWindow(QMainWindow):
         super().__init__()
         self.setWindowTitle("Tree • Простое дерево каталогов (PySide6)")
         self.resize(800, 600)
+        self._tree_thread: QThread | None = None
+        self._tree_worker: TreeWorker | None = None
         self._setup_ui()
 
     def _setup_ui(self):
@@ -159,8 +347,8 @@ class MainWindow(QMainWindow):
         self.chk_follow_links = QCheckBox("Следовать симлинкам")
         self.chk_follow_links.setChecked(False)
 
-        build_btn = QPushButton("Построить")
-        build_btn.clicked.connect(self._build_tree)
+        self.build_btn = QPushButton("Построить")
+        self.build_btn.clicked.connect(self._build_tree)
 
         save_btn = QPushButton("Сохранить в файл…")
         save_btn.clicked.connect(self._save_to_file)
@@ -188,7 +376,7 @@ class MainWindow(QMainWindow):
         grid.addWidget(self.chk_follow_links, 3, 2)
 
         button_row = QHBoxLayout()
-        button_row.addWidget(build_btn)
+        button_row.addWidget(self.build_btn)
         button_row.addWidget(save_btn)
         button_row.addStretch()
 
@@ -224,13 +412,43 @@ class MainWindow(QMainWindow):
             QMessageBox.critical(self, "Ошибка", f"Путь «{root}» не найден.")
             return
 
-        try:
-            lines = build_tree(root, self._gather_options())
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Не удалось построить дерево:\n{e}")
-            return
-
-        self.output.setPlainText("\n".join(lines))
+        # Обход — в фоновом потоке, строки появляются в окне по мере готовности
+        self.output.clear()
+        self.build_btn.setEnabled(False)
+
+        thread = QThread(self)
+        worker = TreeWorker(root, self._gather_options())
+        worker.moveToThread(thread)
+
+        thread.started.connect(worker.run)
+        worker.lines_batch.connect(self.output.appendPlainText, Qt.QueuedConnection)
+        worker.error.connect(self._on_tree_error)
+
+        for sig in (worker.finished, worker.error):
+            sig.connect(thread.quit)
+        thread.finished.connect(self._on_tree_thread_done)
+
+        self._tree_thread = thread
+        self._tree_worker = worker
+        thread.start()
+
+    def _on_tree_error(self, text: str):
+        QMessageBox.critical(self, "Ошибка", f"Не удалось построить дерево:\n{text}")
+
+    def _on_tree_thread_done(self):
+        if self._tree_worker is not None:
+            self._tree_worker.deleteLater()
+        if self._tree_thread is not None:
+            self._tree_thread.deleteLater()
+        self._tree_worker = None
+        self._tree_thread = None
+        self.build_btn.setEnabled(True)
+
+    def closeEvent(self, event):
+        # Дожидаемся фонового обхода, чтобы поток не остался без окна
+        if self._tree_thread is not None and self._tree_thread.isRunning():
+            self._tree_thread.wait()
+        super().closeEvent(event)
 
     def _save_to_file(self):
         text = self.output.toPlainText()
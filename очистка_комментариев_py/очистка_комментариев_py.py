@@ -19,10 +19,12 @@ from tkinter import filedialog, messagebox
 from pathlib import Path
 import ast
 import io
+import multiprocessing
 import os
 import re
 import shutil
 from datetime import datetime
+from functools import partial
 import tokenize
 
 # =========================
@@ -34,17 +36,37 @@ REMOVE_EMPTY_COMMENT_LINES = True      # удалять строки, ставш
 MAKE_BACKUP = True                     # делать .bak_YYYYmmdd_HHMMSS рядом с файлом
 
 CODING_RE = re.compile(r"coding[:=]\s*([-\w.]+)")
-TRIPLE_RE = re.compile(r'(?is)^([rub]*)("""|\'\'\')(.*?)(\2)$')
+STRING_PREFIX_CHARS = "rRuUbB"
+TRIPLE_QUOTES = ('"""', "'''")
 CSS_BLOCK_RE = re.compile(r"/\*.*?\*/", re.S)
+QSS_MARK_RE = re.compile(r"qss", re.I)
+
+def _special_string_starts(
+    src: str,
+    *,
+    want_docstrings: bool,
+    want_qss: bool,
+) -> tuple[set[tuple[int, int]], set[tuple[int, int]]]:
+    """
+    Один ast.parse + один ast.walk на файл. Возвращает (doc_starts, qss_starts):
+    - doc_starts: set((lineno, col)) начала docstring-ов (module/class/func)
+    - qss_starts: начала строковых литералов, присвоенных переменным
+      с именем содержащим 'QSS'
+    """
+    doc_starts: set[tuple[int, int]] = set()
+    qss_starts: set[tuple[int, int]] = set()
+
+    # Нет "QSS" в тексте (в любом регистре) — не может быть и QSS-переменных
+    if want_qss and not QSS_MARK_RE.search(src):
+        want_qss = False
+
+    if not (want_docstrings or want_qss):
+        return doc_starts, qss_starts
 
-def _docstring_token_starts(src: str) -> set[tuple[int, int]]:
-    """Возвращает set((lineno, col)) начала docstring-ов (module/class/func)."""
     try:
         tree = ast.parse(src)
     except SyntaxError:
-        return set()
-
-    starts: set[tuple[int, int]] = set()
+        return doc_starts, qss_starts
 
     def maybe_add(body):
         if not body:
@@ -57,46 +79,42 @@ def _docstring_token_starts(src: str) -> set[tuple[int, int]]:
             and getattr(first, "lineno", None) is not None
             and getattr(first, "col_offset", None) is not None
         ):
-            starts.add((first.lineno, first.col_offset))
-
-    # module docstring
-    maybe_add(getattr(tree, "body", []))
+            doc_starts.add((first.lineno, first.col_offset))
 
-    # class/func docstrings
     for node in ast.walk(tree):
-        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        # module/class/func docstrings
+        if want_docstrings and isinstance(
+            node, (ast.Module, ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+        ):
             maybe_add(getattr(node, "body", []))
-
-    return starts
-
-def _qss_string_token_starts(src: str) -> set[tuple[int, int]]:
-    """Начала строковых литералов, присвоенных переменным с именем содержащим 'QSS'."""
-    try:
-        tree = ast.parse(src)
-    except SyntaxError:
-        return set()
-
-    starts: set[tuple[int, int]] = set()
-    for node in ast.walk(tree):
-        if isinstance(node, ast.Assign) and isinstance(node.value, ast.Constant) and isinstance(node.value.value, str):
+        elif (
+            want_qss
+            and isinstance(node, ast.Assign)
+            and isinstance(node.value, ast.Constant)
+            and isinstance(node.value.value, str)
+        ):
             for t in node.targets:
                 if isinstance(t, ast.Name) and "QSS" in t.id.upper():
-                    starts.add((node.value.lineno, node.value.col_offset))
-    return starts
+                    qss_starts.add((node.value.lineno, node.value.col_offset))
+
+    return doc_starts, qss_starts
 
 def _strip_css_comments_in_triple_literal(literal: str) -> str:
     """
     Удаляет /*...*/ только если это тройной литерал.
     Не трогаем f-строки.
     """
-    if literal[:1].lower() == "f" or literal[:2].lower().startswith(("rf", "fr")):
-        return literal
-    m = TRIPLE_RE.match(literal)
-    if not m:
+    # Префикс (r/u/b, до 2 символов) и кавычки разбираем вручную —
+    # без regex на каждый литерал; f в префиксе сюда не пройдёт
+    i = 0
+    while i < 2 and literal[i:i + 1] and literal[i] in STRING_PREFIX_CHARS:
+        i += 1
+    quote = literal[i:i + 3]
+    if quote not in TRIPLE_QUOTES or len(literal) < i + 6 or not literal.endswith(quote):
         return literal
-    prefix, quote, body, _ = m.groups()
+    body = literal[i + 3:-3]
     body2 = CSS_BLOCK_RE.sub("", body)
-    return f"{prefix}{quote}{body2}{quote}"
+    return f"{literal[:i]}{quote}{body2}{quote}"
 
 def _strip_comments_from_source(
     src: str,
@@ -107,11 +125,29 @@ def _strip_comments_from_source(
     keep_encoding_cookie: bool = True,
     remove_empty_comment_lines: bool = True,
 ) -> str:
-    doc_starts = _docstring_token_starts(src) if remove_docstrings else set()
-    qss_starts = _qss_string_token_starts(src) if remove_qss_css_comments else set()
+    doc_starts, qss_starts = _special_string_starts(
+        src,
+        want_docstrings=remove_docstrings,
+        want_qss=remove_qss_css_comments,
+    )
+
+    # Вместо tokenize.untokenize правим исходник по смещениям токенов:
+    # копируем куски оригинала между правками, пробелы остаются как были.
+    # Смещение начала каждой строки (строки — как у readline, по "\n").
+    line_starts = [0]
+    pos = src.find("\n")
+    while pos != -1:
+        line_starts.append(pos + 1)
+        pos = src.find("\n", pos + 1)
+    line_starts.append(len(src))
 
-    out_tokens: list[tokenize.TokenInfo] = []
-    removed_comment_on_line: set[int] = set()
+    def offset(rc: tuple[int, int]) -> int:
+        return line_starts[rc[0] - 1] + rc[1]
+
+    def line_range(row: int) -> tuple[int, int]:
+        return line_starts[row - 1], line_starts[min(row, len(line_starts) - 1)]
+
+    edits: list[tuple[int, int, str]] = []   # (начало, конец, замена)
 
     tokgen = tokenize.generate_tokens(io.StringIO(src).readline)
     for tok in tokgen:
@@ -123,86 +159,162 @@ def _strip_comments_from_source(
             if (keep_shebang and line == 1 and s.startswith("#!")) or (
                 keep_encoding_cookie and line in (1, 2) and CODING_RE.search(s)
             ):
-                out_tokens.append(tok)
+                continue
+
+            start, end = offset(tok.start), offset(tok.end)
+            ls, next_ls = line_range(line)
+            if not src[ls:start].strip():
+                # строка состояла только из комментария
+                if remove_empty_comment_lines:
+                    edits.append((ls, next_ls, ""))
+                else:
+                    edits.append((ls, end, ""))
             else:
-                removed_comment_on_line.add(line)
+                # комментарий в конце строки — убираем и пробелы перед ним
+                ws = start
+                while ws > ls and src[ws - 1] in " \t":
+                    ws -= 1
+                edits.append((ws, end, ""))
             continue
 
         if tok.type == tokenize.STRING and tok.start in doc_starts:
-            # выкидываем docstring (как отдельный expr stmt)
+            # выкидываем docstring (как отдельный expr stmt);
+            # если он занимает строки целиком — вместе с этими строками
+            start, end = offset(tok.start), offset(tok.end)
+            ls, _ = line_range(tok.start[0])
+            _, next_ls = line_range(tok.end[0])
+            if not src[ls:start].strip() and not src[end:next_ls].strip():
+                edits.append((ls, next_ls, ""))
+            else:
+                edits.append((start, end, ""))
             continue
 
         if tok.type == tokenize.STRING and tok.start in qss_starts:
             # чистим /*...*/ внутри тройной строки
             new_lit = _strip_css_comments_in_triple_literal(tok.string)
             if new_lit != tok.string:
-                tok = tokenize.TokenInfo(tok.type, new_lit, tok.start, tok.end, tok.line)
-
-        out_tokens.append(tok)
+                edits.append((offset(tok.start), offset(tok.end), new_lit))
 
-    new_src = tokenize.untokenize(out_tokens)
+    if not edits:
+        return src
 
-    # Убираем строки, ставшие пустыми после удаления COMMENT (best-effort)
-    if remove_empty_comment_lines and removed_comment_on_line:
-        lines = new_src.splitlines(True)
-        kept = []
-        for i, line in enumerate(lines, 1):
-            if i in removed_comment_on_line and line.strip() == "":
-                continue
-            kept.append(line)
-        new_src = "".join(kept)
-
-    return new_src
+    edits.sort()
+    out: list[str] = []
+    pos = 0
+    for start, end, repl in edits:
+        if start < pos:
+            # правка внутри уже удалённого диапазона
+            continue
+        out.append(src[pos:start])
+        out.append(repl)
+        pos = end
+    out.append(src[pos:])
+    return "".join(out)
 
-def _read_text_with_detected_encoding(path: Path) -> tuple[str, str, str, bool]:
+def _read_text_with_detected_encoding(path: Path) -> tuple[str, str, str, bool, bytes]:
     """
-    Возвращает: (text, encoding, newline, had_trailing_newline)
-    Открываем через tokenize.open -> уважает PEP 263.
+    Возвращает: (text, encoding, newline, had_trailing_newline, raw_bytes)
+    Файл читается один раз; кодировку определяем tokenize.detect_encoding
+    (как tokenize.open -> уважает PEP 263 и BOM), переводы строк в тексте
+    приводим к "\n" — как универсальный режим TextIOWrapper.
     """
     raw = path.read_bytes()
     newline = "\r\n" if b"\r\n" in raw else "\n"
     had_trailing_newline = raw.endswith(b"\n")
 
-    with tokenize.open(str(path)) as f:
-        text = f.read()
-        enc = f.encoding or "utf-8"
+    enc, _ = tokenize.detect_encoding(io.BytesIO(raw).readline)
+    text = raw.decode(enc)
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
 
-    return text, enc, newline, had_trailing_newline
+    return text, enc, newline, had_trailing_newline, raw
 
 def _write_text_preserve_newline(path: Path, text: str, encoding: str, newline: str, want_trailing_newline: bool) -> None:
+    # Кодируем один раз и меняем переводы строк уже в байтах (detect_encoding
+    # отдаёт ASCII-совместимые кодировки, так что b"\n" однозначен).
+    data = text.encode(encoding)
+    nl = newline.encode("ascii")
     if newline != "\n":
-        text = text.replace("\n", newline)
-    if want_trailing_newline and not text.endswith(newline):
-        text += newline
+        data = data.replace(b"\n", nl)
+    if want_trailing_newline and not data.endswith(nl):
+        data += nl
 
-    with open(path, "w", encoding=encoding, newline="") as f:
-        f.write(text)
+    path.write_bytes(data)
 
-def _backup(path: Path) -> Path:
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+def _copy_file(src: Path, dst: Path) -> None:
+    """
+    Копия файла с метаданными (как shutil.copy2).
+    На Linux пробуем copy_file_range(2): копирование внутри ядра,
+    а на btrfs/xfs — reflink без переноса данных. Если не вышло — copy2.
+    Жёсткую ссылку (os.link) не используем: исходник потом перезаписывается
+    на месте, и «бэкап» изменился бы вместе с ним.
+    """
+    if hasattr(os, "copy_file_range"):
+        try:
+            with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+                remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    n = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if n == 0:
+                        break
+                    remaining -= n
+            if remaining == 0:
+                shutil.copystat(src, dst)
+                return
+        except OSError:
+            # EXDEV/ENOSYS/EOPNOTSUPP и т.п. — копируем обычным способом
+            pass
+    shutil.copy2(src, dst)
+
+def _backup_timestamp() -> str:
+    return datetime.now().strftime("%Y%m%d_%H%M%S")
+
+def _backup(path: Path, ts: str | None = None) -> Path:
+    """ts — общая метка времени пачки (если None — берём текущее время)."""
+    if ts is None:
+        ts = _backup_timestamp()
     bak = path.with_suffix(path.suffix + f".bak_{ts}")
-    shutil.copy2(path, bak)
+    _copy_file(path, bak)
     return bak
 
-def process_file(path: Path) -> tuple[bool, str]:
+def _nothing_to_strip(raw: bytes) -> bool:
+    """
+    Быстрая проверка по байтам (memchr в C): если нет '#' и тройных кавычек,
+    то нет ни комментариев, ни QSS-блоков. Docstring в одинарных кавычках
+    возможен, поэтому при REMOVE_DOCSTRINGS дополнительно не должно быть кавычек.
+    """
+    if b"#" in raw or b'"""' in raw or b"'''" in raw:
+        return False
+    if REMOVE_DOCSTRINGS and (b'"' in raw or b"'" in raw):
+        return False
+    return True
+
+def process_file(path: Path, ts: str | None = None) -> tuple[bool, str]:
     try:
-        src, enc, nl, had_nl = _read_text_with_detected_encoding(path)
+        src, enc, nl, had_nl, raw = _read_text_with_detected_encoding(path)
     except Exception as e:
         return False, f"{path.name}: не смог прочитать ({e})"
 
-    new_src = _strip_comments_from_source(
-        src,
-        remove_docstrings=REMOVE_DOCSTRINGS,
-        remove_qss_css_comments=REMOVE_QSS_CSS_COMMENTS,
-        remove_empty_comment_lines=REMOVE_EMPTY_COMMENT_LINES,
-    )
+    if _nothing_to_strip(raw):
+        return False, f"{path.name}: изменений нет"
+
+    # Ошибка разбора одного файла не должна ронять весь пакет в Pool.map
+    try:
+        new_src = _strip_comments_from_source(
+            src,
+            remove_docstrings=REMOVE_DOCSTRINGS,
+            remove_qss_css_comments=REMOVE_QSS_CSS_COMMENTS,
+            remove_empty_comment_lines=REMOVE_EMPTY_COMMENT_LINES,
+        )
+    except Exception as e:
+        return False, f"{path.name}: не смог разобрать ({e})"
 
     if new_src == src:
         return False, f"{path.name}: изменений нет"
 
     try:
         if MAKE_BACKUP:
-            _backup(path)
+            _backup(path, ts)
         _write_text_preserve_newline(path, new_src, enc, nl, had_nl)
         return True, f"{path.name}: OK"
     except Exception as e:
@@ -219,10 +331,22 @@ def main():
     if not paths:
         return
 
+    # Разбор/токенизация — чистый CPU на Python, поэтому файлы обрабатываем
+    # параллельно в процессах (map сохраняет порядок для отчёта)
+    files = [Path(p) for p in paths]
+
+    # одна метка времени на весь запуск: бэкапы пачки легко найти вместе
+    worker = partial(process_file, ts=_backup_timestamp())
+    if len(files) > 1:
+        workers = min(len(files), os.cpu_count() or 1)
+        with multiprocessing.Pool(workers) as pool:
+            results = pool.map(worker, files)
+    else:
+        results = [worker(f) for f in files]
+
     changed = 0
     msgs = []
-    for p in paths:
-        ok, msg = process_file(Path(p))
+    for ok, msg in results:
         msgs.append(msg)
         if ok:
             changed += 1
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+Тесты файловых операций переключателя (без запуска окна).
+
+Нужен PySide6, иначе тесты пропускаются.
+Запуск:
+    python -m pytest переключатель_аккаунтов_codex
+"""
+import importlib.util
+import json
+import os
+import stat
+import sys
+
+import pytest
+
+pytest.importorskip("PySide6")
+
+_SCRIPT = os.path.join(os.path.dirname(__file__), "переключатель_аккаунтов_codex.py")
+_spec = importlib.util.spec_from_file_location("switcher", _SCRIPT)
+switcher = importlib.util.module_from_spec(_spec)
+sys.modules["switcher"] = switcher
+_spec.loader.exec_module(switcher)
+
+
+@pytest.fixture
+def codex_home(tmp_path, monkeypatch):
+    home = tmp_path / ".codex"
+    home.mkdir()
+    profiles = home / "account_profiles"
+    monkeypatch.setattr(switcher, "CODEX_HOME", home)
+    monkeypatch.setattr(switcher, "AUTH_PATH", home / "auth.json")
+    monkeypatch.setattr(switcher, "PROFILES_DIR", profiles)
+    monkeypatch.setattr(switcher, "BACKUPS_DIR", profiles / "_backups")
+    monkeypatch.setattr(switcher, "JOURNAL_PATH", home / "auth_journal.jsonl")
+    switcher._invalidate_profiles_cache()
+    return home
+
+
+def _write_auth(path, account_id):
+    path.write_text(json.dumps({"tokens": {"account_id": account_id, "refresh_token": "r"}}))
+
+
+@pytest.mark.skipif(os.name == "nt", reason="POSIX-права")
+def test_switch_backup_is_private_snapshot(codex_home):
+    auth = codex_home / "auth.json"
+    _write_auth(auth, "old")
+    os.chmod(auth, 0o644)  # живой файл с «широкими» правами
+
+    switcher.save_current_as_profile("second")
+    _write_auth(switcher.PROFILES_DIR / "second" / "auth.json", "new")
+    switcher._invalidate_profiles_cache()
+    profile = next(p for p in switcher.list_profiles() if p.name == "second")
+
+    switcher.switch_to_profile(profile)
+
+    backups = sorted(switcher.BACKUPS_DIR.glob("auth_*.json"))
+    assert len(backups) == 1
+    backup = backups[0]
+    assert stat.S_IMODE(backup.stat().st_mode) == 0o600
+    assert backup.stat().st_ino != auth.stat().st_ino
+    assert json.loads(backup.read_text())["tokens"]["account_id"] == "old"
+    assert switcher.read_current_auth_info().account_id == "new"
+
+
+def test_journaled_copy_does_not_create_profiles_dir(codex_home, tmp_path):
+    src = tmp_path / "win_auth.json"
+    _write_auth(src, "win")
+
+    switcher._copy_file_private(src, codex_home / "auth.json", mode="wsl-import")
+
+    assert not switcher.PROFILES_DIR.exists()
+    rows = [json.loads(line) for line in switcher.JOURNAL_PATH.read_text().splitlines()]
+    assert [r["mode"] for r in rows] == ["wsl-import"]
+
+
+def _profile_with(codex_home, name, plant):
+    profile_dir = switcher.PROFILES_DIR / name
+    profile_dir.mkdir(parents=True)
+    plant(profile_dir / "auth.json")
+    return switcher.ProfileInfo(
+        name=name,
+        directory=profile_dir,
+        auth_path=profile_dir / "auth.json",
+        meta_path=profile_dir / "meta.json",
+        auth=switcher.AuthInfo(None, None, None),
+    )
+
+
+@pytest.mark.skipif(not hasattr(os, "mkfifo"), reason="нужен os.mkfifo")
+def test_switch_rejects_fifo_auth(codex_home):
+    _write_auth(codex_home / "auth.json", "old")
+    profile = _profile_with(codex_home, "fifo", os.mkfifo)
+
+    with pytest.raises(OSError, match="Не обычный файл"):
+        switcher.switch_to_profile(profile)
+    assert switcher.read_current_auth_info().account_id == "old"
+
+
+@pytest.mark.skipif(os.name == "nt", reason="POSIX-ссылки")
+def test_switch_rejects_symlinked_auth(codex_home, tmp_path):
+    _write_auth(codex_home / "auth.json", "old")
+    target = tmp_path / "elsewhere.json"
+    _write_auth(target, "new")
+    profile = _profile_with(codex_home, "link", lambda p: p.symlink_to(target))
+
+    with pytest.raises(OSError, match="символическая ссылка"):
+        switcher.switch_to_profile(profile)
+    assert switcher.read_current_auth_info().account_id == "old"
@@ -11,18 +11,24 @@ GUI-утилита для управления профилями Codex (auth.js
 from __future__ import annotations
 
 import base64
+import errno
+import hashlib
 import json
 import os
 import shutil
+import stat
 import sys
 import subprocess
+import tempfile
 import re
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
 from typing import Any
 
-from PySide6.QtCore import Qt, QUrl
+from PySide6.QtCore import QObject, Qt, QThread, QUrl, Signal
 from PySide6.QtGui import QDesktopServices
 from PySide6.QtWidgets import (
     QApplication,
@@ -51,6 +57,13 @@ CODEX_HOME = _codex_home()
 AUTH_PATH = CODEX_HOME / "auth.json"
 PROFILES_DIR = CODEX_HOME / "account_profiles"
 BACKUPS_DIR = PROFILES_DIR / "_backups"
+SYNC_STATE_PATH = CODEX_HOME / ".sync_state.json"
+# Next to auth.json, so journaling a copy never creates account_profiles/
+JOURNAL_PATH = CODEX_HOME / "auth_journal.jsonl"
+
+# Profile folders are probed in parallel from this many (readdir/stat/read bound)
+PROFILE_SCAN_WORKERS = 8
+PROFILE_SCAN_PARALLEL_MIN = 4
 
 # ----------------------------
 # WSL ↔ Windows auth bootstrap
@@ -68,7 +81,7 @@ BACKUPS_DIR = PROFILES_DIR / "_backups"
 WINDOWS_CODEX_HOME: Path | None = None
 
 
-def _is_wsl() -> bool:
+def _detect_wsl() -> bool:
     if os.name == "nt":
         return False
     if os.environ.get("WSL_DISTRO_NAME") or os.environ.get("WSL_INTEROP"):
@@ -88,6 +101,25 @@ def _is_wsl() -> bool:
     return False
 
 
+@dataclass(frozen=True)
+class Env:
+    # Read once at import: /proc and the environment don't change while the process runs
+    is_wsl: bool
+    is_windows: bool
+    codex_home_env: str | None
+
+
+ENV = Env(
+    is_wsl=_detect_wsl(),
+    is_windows=os.name == "nt",
+    codex_home_env=os.environ.get("CODEX_HOME") or None,
+)
+
+
+def _is_wsl() -> bool:
+    return ENV.is_wsl
+
+
 def _run_capture(cmd: list[str], *, timeout_s: float = 3.0) -> str | None:
     try:
         p = subprocess.run(
@@ -105,6 +137,9 @@ def _run_capture(cmd: list[str], *, timeout_s: float = 3.0) -> str | None:
         return None
 
 
+_WIN_PATH_RE = re.compile(r"^([A-Za-z]):[\\/](.*)$")
+
+
 def _win_to_wsl_path(win_path: str) -> Path | None:
     win_path = (win_path or "").strip()
     if not win_path:
@@ -116,7 +151,7 @@ def _win_to_wsl_path(win_path: str) -> Path | None:
         return Path(out)
 
     # Fallback for simple "C:\Users\Name" paths
-    m = re.match(r"^([A-Za-z]):[\\/](.*)$", win_path)
+    m = _WIN_PATH_RE.match(win_path)
     if not m:
         return None
     drive = m.group(1).lower()
@@ -124,8 +159,48 @@ def _win_to_wsl_path(win_path: str) -> Path | None:
     return Path(f"/mnt/{drive}/{rest}")
 
 
+# Profile folders under C:\Users that never belong to a real user
+_WINDOWS_SYSTEM_PROFILES = frozenset(
+    {"public", "default", "default user", "all users", "defaultapppool", "wdagutilityaccount"}
+)
+
+_windows_userprofile: Path | None = None
+_windows_userprofile_resolved = False
+
+
 def _find_windows_userprofile() -> Path | None:
-    # Try cmd.exe (WSL interop)
+    global _windows_userprofile, _windows_userprofile_resolved
+    if not _windows_userprofile_resolved:
+        _windows_userprofile = _resolve_windows_userprofile()
+        _windows_userprofile_resolved = True
+    return _windows_userprofile
+
+
+def _resolve_windows_userprofile() -> Path | None:
+    # Exported through WSLENV (e.g. WSLENV=USERPROFILE/p) — no interop call needed
+    for var in ("WSL_USERPROFILE", "USERPROFILE"):
+        value = os.environ.get(var)
+        if value:
+            if value.startswith("/"):
+                return Path(value)
+            p = _win_to_wsl_path(value)
+            if p:
+                return p
+
+    # A single real user folder under /mnt/c/Users is unambiguous
+    try:
+        with os.scandir("/mnt/c/Users") as it:
+            users = [
+                e.path
+                for e in it
+                if e.name.lower() not in _WINDOWS_SYSTEM_PROFILES and e.is_dir(follow_symlinks=False)
+            ]
+    except OSError:
+        users = []
+    if len(users) == 1:
+        return Path(users[0])
+
+    # Last resort: cmd.exe (WSL interop, slow)
     out = _run_capture(["cmd.exe", "/c", "echo", "%USERPROFILE%"])
     if not out:
         out = _run_capture(["/mnt/c/Windows/System32/cmd.exe", "/c", "echo", "%USERPROFILE%"])
@@ -134,6 +209,17 @@ def _find_windows_userprofile() -> Path | None:
     return _win_to_wsl_path(out)
 
 
+def _find_entry(directory: str, name: str) -> os.DirEntry | None:
+    try:
+        with os.scandir(directory) as it:
+            for e in it:
+                if e.name == name:
+                    return e
+    except OSError:
+        pass
+    return None
+
+
 def _find_windows_codex_home() -> Path | None:
     # Manual override (can be Windows path or already a /mnt/* path)
     override = os.environ.get("CODEX_WIN_HOME")
@@ -155,24 +241,39 @@ def _find_windows_codex_home() -> Path | None:
         if p.exists():
             return p
 
-    # Fallback: scan common location
-    base = Path("/mnt/c/Users")
-    if base.exists():
-        candidates: list[Path] = []
+    # Fallback: scan common location. Every call under /mnt/c crosses the 9P
+    # bridge, so presence is checked from directory listings and only the
+    # auth.json files actually found are stat'ed.
+    base = "/mnt/c/Users"
+    candidates: list[tuple[float, str]] = []
+    try:
+        with os.scandir(base) as users:
+            user_dirs = [d.path for d in users if d.is_dir()]
+    except OSError:
+        user_dirs = []
+
+    for user_dir in user_dirs:
+        codex_dir = _find_entry(user_dir, ".codex")
+        if codex_dir is None:
+            continue
         try:
-            for d in base.iterdir():
-                if not d.is_dir():
-                    continue
-                cand = d / ".codex"
-                if (cand / "auth.json").exists():
-                    candidates.append(cand)
-        except Exception:
-            candidates = []
+            if not codex_dir.is_dir():
+                continue
+        except OSError:
+            continue
+        auth = _find_entry(codex_dir.path, "auth.json")
+        if auth is None:
+            continue
+        try:
+            candidates.append((auth.stat().st_mtime, codex_dir.path))
+        except OSError:
+            continue
 
-        if candidates:
-            # Choose the one with the newest auth.json
-            candidates.sort(key=lambda p: (p / "auth.json").stat().st_mtime, reverse=True)
-            return candidates[0]
+    if candidates:
+        # Choose the one with the newest auth.json; mtimes were collected during
+        # the scan, so no stat per comparison. Keying on mtime alone keeps the
+        # first-listed folder on ties, like the old stable sort did.
+        return Path(max(candidates, key=lambda c: c[0])[1])
 
     return None
 
@@ -183,7 +284,7 @@ def _sync_wsl_windows_auth() -> str | None:
     """
     if not _is_wsl():
         return None
-    if os.environ.get("CODEX_HOME"):
+    if ENV.codex_home_env:
         # User explicitly controls where Codex reads auth.json from.
         return None
 
@@ -192,20 +293,67 @@ def _sync_wsl_windows_auth() -> str | None:
         return None
 
     global WINDOWS_CODEX_HOME
+    # Both auth.json untouched since the last run: nothing to sync, and the
+    # Windows home doesn't need to be looked up again (slow over 9P/interop).
+    state_key = {"mode": mode, "win_override": os.environ.get("CODEX_WIN_HOME") or None}
+    state = _load_sync_state()
+    if state and all(state.get(k) == v for k, v in state_key.items()) and state.get("win_path"):
+        win_home = Path(state["win_path"])
+        if (
+            state.get("win_mtime_ns") == _mtime_ns(win_home / "auth.json")
+            and state.get("wsl_mtime_ns") == _mtime_ns(AUTH_PATH)
+        ):
+            WINDOWS_CODEX_HOME = win_home
+            return None
+
     WINDOWS_CODEX_HOME = _find_windows_codex_home()
     if not WINDOWS_CODEX_HOME:
         return None
 
     win_auth = WINDOWS_CODEX_HOME / "auth.json"
-    wsl_auth = AUTH_PATH
+    note = _sync_auth_files(mode, win_auth, AUTH_PATH)
+    _save_sync_state(
+        {
+            **state_key,
+            "win_path": str(WINDOWS_CODEX_HOME),
+            "win_mtime_ns": _mtime_ns(win_auth),
+            "wsl_mtime_ns": _mtime_ns(AUTH_PATH),
+        }
+    )
+    return note
+
+
+def _mtime_ns(path: Path) -> int | None:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def _load_sync_state() -> dict[str, Any] | None:
+    try:
+        state = _load_json(SYNC_STATE_PATH)
+    except Exception:
+        return None
+    return state if isinstance(state, dict) else None
+
 
+def _save_sync_state(state: dict[str, Any]) -> None:
+    try:
+        _safe_mkdir(CODEX_HOME)
+        _write_text_private(SYNC_STATE_PATH, json.dumps(state, ensure_ascii=False))
+    except OSError:
+        pass
+
+
+def _sync_auth_files(mode: str, win_auth: Path, wsl_auth: Path) -> str | None:
     if mode == "bootstrap":
         if wsl_auth.exists():
             return None
         if not win_auth.exists():
             return None
         _safe_mkdir(CODEX_HOME)
-        _copy_file_private(win_auth, wsl_auth)
+        _copy_file_private(win_auth, wsl_auth, mode="wsl-import")
         return f"WSL: импортировал auth.json из Windows: {win_auth}"
 
     if mode == "newest":
@@ -213,10 +361,10 @@ def _sync_wsl_windows_auth() -> str | None:
             return None
         if win_auth.exists() and not wsl_auth.exists():
             _safe_mkdir(CODEX_HOME)
-            _copy_file_private(win_auth, wsl_auth)
+            _copy_file_private(win_auth, wsl_auth, mode="wsl-import")
             return f"WSL: импортировал auth.json из Windows: {win_auth}"
         if wsl_auth.exists() and not win_auth.exists():
-            _copy_file_private(wsl_auth, win_auth)
+            _copy_file_private(wsl_auth, win_auth, mode="wsl-export")
             return f"WSL: экспортировал auth.json в Windows: {win_auth}"
 
         # Both exist: copy the newer one over the older
@@ -231,15 +379,19 @@ def _sync_wsl_windows_auth() -> str | None:
 
         if win_m > wsl_m:
             _safe_mkdir(CODEX_HOME)
-            _copy_file_private(win_auth, wsl_auth)
+            _copy_file_private(win_auth, wsl_auth, mode="wsl-import")
             return f"WSL: обновил auth.json из Windows (новее): {win_auth}"
         else:
-            _copy_file_private(wsl_auth, win_auth)
+            _copy_file_private(wsl_auth, win_auth, mode="wsl-export")
             return f"WSL: обновил auth.json в Windows (новее в WSL): {win_auth}"
 
     return None
 
 
+class WriteCorruption(OSError):
+    """Read-back of a freshly written file doesn't match the source bytes."""
+
+
 @dataclass(frozen=True)
 class AuthInfo:
     account_id: str | None
@@ -257,7 +409,9 @@ class ProfileInfo:
 
 
 def _load_json(path: Path) -> Any:
-    return json.loads(path.read_text(encoding="utf-8"))
+    # json.loads takes bytes directly: no intermediate decoded str
+    with open(path, "rb") as f:
+        return json.loads(f.read())
 
 
 def _safe_mkdir(path: Path) -> None:
@@ -271,34 +425,76 @@ def _safe_mkdir(path: Path) -> None:
         pass
 
 
-def _write_text_private(path: Path, text: str) -> None:
-    tmp = path.with_suffix(path.suffix + ".tmp")
-    tmp.write_text(text, encoding="utf-8")
+def _stage_bytes_private(path: Path, data: bytes, *, sha256: bytes | None = None) -> str:
+    # Unique temp file next to the target, later renamed over it. mkstemp opens
+    # with O_CREAT|O_EXCL and mode 0600, so permissions are private from the
+    # start: no chmod afterwards, no clobbered temp, no planted symlink followed.
+    fd, tmp = tempfile.mkstemp(prefix=path.name + ".", suffix=".tmp", dir=str(path.parent))
     try:
-        os.chmod(tmp, 0o600)
-    except OSError:
-        pass
-    os.replace(tmp, path)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        if sha256 is not None:
+            # Verify what actually landed on disk before it replaces the target
+            with open(tmp, "rb") as f:
+                if hashlib.sha256(f.read()).digest() != sha256:
+                    raise WriteCorruption(f"Содержимое не совпало после записи: {path}")
+    except BaseException:
+        _discard_tmp(tmp)
+        raise
+    return tmp
+
+
+def _discard_tmp(tmp: str) -> None:
     try:
-        os.chmod(path, 0o600)
+        os.unlink(tmp)
     except OSError:
         pass
 
 
-def _copy_file_private(src: Path, dst: Path) -> None:
-    tmp = dst.with_suffix(dst.suffix + ".tmp")
-    tmp.write_bytes(src.read_bytes())
+def _write_bytes_private(path: Path, data: bytes, *, sha256: bytes | None = None) -> None:
+    tmp = _stage_bytes_private(path, data, sha256=sha256)
     try:
-        os.chmod(tmp, 0o600)
-    except OSError:
-        pass
-    os.replace(tmp, dst)
+        os.replace(tmp, path)
+    except BaseException:
+        _discard_tmp(tmp)
+        raise
+
+
+def _write_text_private(path: Path, text: str) -> None:
+    _write_bytes_private(path, text.encode("utf-8"))
+
+
+def _append_journal(dst: Path, digest: bytes, size: int, mode: str) -> None:
+    # One short line per O_APPEND write — appends from parallel runs don't interleave
+    row = {
+        "ts": datetime.now(timezone.utc).isoformat(),
+        "dst": str(dst),
+        "sha256": digest.hex(),
+        "bytes": size,
+        "mode": mode,
+    }
+    line = (json.dumps(row, ensure_ascii=False) + "\n").encode("utf-8")
     try:
-        os.chmod(dst, 0o600)
+        _safe_mkdir(JOURNAL_PATH.parent)
+        fd = os.open(JOURNAL_PATH, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
     except OSError:
+        # The journal is informational; never fail the copy because of it
         pass
 
 
+def _copy_file_private(src: Path, dst: Path, *, mode: str = "copy") -> None:
+    data = src.read_bytes()
+    digest = hashlib.sha256(data).digest()
+    _write_bytes_private(dst, data, sha256=digest)
+    _append_journal(dst, digest, len(data), mode)
+
+
 def _decode_jwt_payload(token: str) -> dict[str, Any] | None:
     parts = token.split(".")
     if len(parts) < 2:
@@ -313,6 +509,17 @@ def _decode_jwt_payload(token: str) -> dict[str, Any] | None:
         return None
 
 
+@lru_cache(maxsize=64)
+def _email_from_id_token(id_token: str) -> str | None:
+    # The same token is seen on every refresh; decode it once
+    payload = _decode_jwt_payload(id_token)
+    if isinstance(payload, dict):
+        v = payload.get("email") or payload.get("preferred_username")
+        if isinstance(v, str) and v:
+            return v
+    return None
+
+
 def _extract_auth_info(auth: dict[str, Any]) -> AuthInfo:
     tokens = auth.get("tokens") if isinstance(auth, dict) else None
     account_id = None
@@ -328,11 +535,7 @@ def _extract_auth_info(auth: dict[str, Any]) -> AuthInfo:
             id_token = v
 
     if id_token:
-        payload = _decode_jwt_payload(id_token)
-        if isinstance(payload, dict):
-            v = payload.get("email") or payload.get("preferred_username")
-            if isinstance(v, str) and v:
-                email = v
+        email = _email_from_id_token(id_token)
 
     login_type = None
     api_key = auth.get("OPENAI_API_KEY") if isinstance(auth, dict) else None
@@ -364,7 +567,7 @@ def _validate_profile_name(name: str) -> str:
         raise ValueError("Некорректное имя профиля.")
     if any(sep in name for sep in ("/", "\\")):
         raise ValueError("Имя профиля не должно содержать / или \\.")
-    if os.name == "nt":
+    if ENV.is_windows:
         invalid = '<>:"/\\|?*'
         if any(ch in invalid for ch in name):
             raise ValueError(f"Имя профиля не должно содержать символы: {invalid}")
@@ -373,41 +576,87 @@ def _validate_profile_name(name: str) -> str:
     return name
 
 
+# list_profiles() snapshot. "profiles" is valid while PROFILES_DIR mtime is
+# unchanged (adding/removing a profile directory bumps it); "entries" maps
+# profile name -> ((auth.json mtime_ns, size), ProfileInfo) and survives
+# invalidation, so a rescan only re-parses auth.json files that changed.
+_profiles_cache: dict[str, Any] = {"dir_mtime": None, "profiles": [], "entries": {}}
+
+
+def _invalidate_profiles_cache() -> None:
+    _profiles_cache["dir_mtime"] = None
+
+
+def _read_auth_info_or_empty(path: Path) -> AuthInfo:
+    try:
+        return read_auth_info_from_path(path)
+    except Exception:
+        return AuthInfo(account_id=None, email=None, login_type=None)
+
+
 def list_profiles() -> list[ProfileInfo]:
-    if not PROFILES_DIR.exists():
+    try:
+        dir_mtime = PROFILES_DIR.stat().st_mtime_ns
+    except OSError:
+        _invalidate_profiles_cache()
+        _profiles_cache["entries"] = {}
         return []
+    if _profiles_cache["dir_mtime"] == dir_mtime:
+        return list(_profiles_cache["profiles"])
 
-    profiles: list[ProfileInfo] = []
-    for entry in sorted(PROFILES_DIR.iterdir(), key=lambda p: p.name.lower()):
-        if not entry.is_dir():
-            continue
-        if entry.name.startswith("_"):
-            continue
+    try:
+        with os.scandir(PROFILES_DIR) as it:
+            entries = sorted(it, key=lambda e: e.name.lower())
+    except OSError:
+        return []
 
-        auth_path = entry / "auth.json"
-        meta_path = entry / "meta.json"
-        if not auth_path.exists():
-            continue
+    cached: dict[str, tuple[tuple[int, int], ProfileInfo]] = _profiles_cache["entries"]
+    dirs = [e for e in entries if not e.name.startswith("_") and e.is_dir()]
 
-        auth_info = AuthInfo(account_id=None, email=None, login_type=None)
+    def scan(entry: os.DirEntry) -> tuple[tuple[int, int], ProfileInfo] | None:
+        # One readdir of the profile folder instead of exists() per file
+        auth_entry = _find_entry(entry.path, "auth.json")
+        if auth_entry is None:
+            return None
         try:
-            auth = _load_json(auth_path)
-            if isinstance(auth, dict):
-                auth_info = _extract_auth_info(auth)
-        except Exception:
-            pass
-
-        profiles.append(
-            ProfileInfo(
-                name=entry.name,
-                directory=entry,
-                auth_path=auth_path,
-                meta_path=meta_path,
-                auth=auth_info,
-            )
+            auth_st = auth_entry.stat()
+        except OSError:
+            return None
+
+        key = (auth_st.st_mtime_ns, auth_st.st_size)
+        hit = cached.get(entry.name)
+        if hit is not None and hit[0] == key:
+            return hit
+        directory = Path(entry.path)
+        auth_path = directory / "auth.json"
+        profile = ProfileInfo(
+            name=entry.name,
+            directory=directory,
+            auth_path=auth_path,
+            meta_path=directory / "meta.json",
+            auth=_read_auth_info_or_empty(auth_path),
         )
+        return key, profile
 
-    return profiles
+    if len(dirs) >= PROFILE_SCAN_PARALLEL_MIN:
+        with ThreadPoolExecutor(max_workers=min(PROFILE_SCAN_WORKERS, len(dirs))) as pool:
+            results = list(pool.map(scan, dirs))
+    else:
+        results = [scan(e) for e in dirs]
+
+    fresh: dict[str, tuple[tuple[int, int], ProfileInfo]] = {}
+    profiles: list[ProfileInfo] = []
+    for entry, result in zip(dirs, results):
+        if result is None:
+            continue
+        fresh[entry.name] = result
+        profiles.append(result[1])
+
+    # Names missing from this scan (deleted profiles) drop out with the old map
+    _profiles_cache["entries"] = fresh
+    _profiles_cache["profiles"] = profiles
+    _profiles_cache["dir_mtime"] = dir_mtime
+    return list(profiles)
 
 
 def save_current_as_profile(name: str, *, overwrite: bool = False) -> ProfileInfo:
@@ -422,7 +671,7 @@ def save_current_as_profile(name: str, *, overwrite: bool = False) -> ProfileInf
 
     _safe_mkdir(profile_dir)
     auth_dst = profile_dir / "auth.json"
-    _copy_file_private(AUTH_PATH, auth_dst)
+    _copy_file_private(AUTH_PATH, auth_dst, mode="save")
 
     auth_info = read_auth_info_from_path(auth_dst)
     meta = {
@@ -434,6 +683,8 @@ def save_current_as_profile(name: str, *, overwrite: bool = False) -> ProfileInf
     }
     meta_path = profile_dir / "meta.json"
     _write_text_private(meta_path, json.dumps(meta, ensure_ascii=False, indent=2))
+    # Overwriting an existing profile doesn't touch PROFILES_DIR mtime
+    _invalidate_profiles_cache()
 
     return ProfileInfo(
         name=name,
@@ -457,20 +708,64 @@ def _backup_current_auth() -> Path | None:
     _safe_mkdir(BACKUPS_DIR)
     ts = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
     backup_path = BACKUPS_DIR / f"auth_{ts}.json"
-    shutil.copy2(AUTH_PATH, backup_path)
-    try:
-        os.chmod(backup_path, 0o600)
-    except OSError:
-        pass
+    # Always a private copy, never a hard link: a link would share the live
+    # file's inode (its mode/owner and any later in-place writes).
+    _copy_file_private(AUTH_PATH, backup_path, mode="backup")
     return backup_path
 
 
+def _read_profile_file(directory: Path, name: str) -> bytes:
+    # Bind the profile folder once and open the file relative to it, refusing a
+    # symlink in its place: no check-then-open window on the path name.
+    # The folder itself is opened *with* symlink following on purpose:
+    # list_profiles() lists symlinked profile folders, so they must stay
+    # switchable; only the auth.json inside is pinned with O_NOFOLLOW.
+    nofollow = getattr(os, "O_NOFOLLOW", 0)
+    if os.open not in os.supports_dir_fd or not nofollow:
+        return (directory / name).read_bytes()
+    path = directory / name
+    dir_fd = os.open(directory, os.O_RDONLY | getattr(os, "O_DIRECTORY", 0))
+    try:
+        # lstat first: opening a FIFO named auth.json would block forever.
+        # O_NONBLOCK covers a swap between the lstat and the open; it has no
+        # effect on reads from a regular file.
+        st = os.stat(name, dir_fd=dir_fd, follow_symlinks=False)
+        if stat.S_ISLNK(st.st_mode):
+            raise OSError(errno.ELOOP, f"auth.json профиля — символическая ссылка: {path}")
+        if not stat.S_ISREG(st.st_mode):
+            raise OSError(f"Не обычный файл: {path}")
+        try:
+            fd = os.open(name, os.O_RDONLY | nofollow | getattr(os, "O_NONBLOCK", 0), dir_fd=dir_fd)
+        except OSError as e:
+            if e.errno == errno.ELOOP:
+                raise OSError(errno.ELOOP, f"auth.json профиля — символическая ссылка: {path}") from None
+            raise
+    finally:
+        os.close(dir_fd)
+    with os.fdopen(fd, "rb") as f:
+        if not stat.S_ISREG(os.fstat(f.fileno()).st_mode):
+            raise OSError(f"Не обычный файл: {path}")
+        return f.read()
+
+
 def switch_to_profile(profile: ProfileInfo) -> None:
-    if not profile.auth_path.exists():
-        raise FileNotFoundError(f"Не найден файл профиля: {profile.auth_path}")
+    try:
+        data = _read_profile_file(profile.directory, profile.auth_path.name)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Не найден файл профиля: {profile.auth_path}") from None
     _safe_mkdir(CODEX_HOME)
-    _backup_current_auth()
-    _copy_file_private(profile.auth_path, AUTH_PATH)
+
+    # Stage the new auth.json first, then back up the old one and rename the
+    # staged file over it: auth.json is never missing or half-written.
+    digest = hashlib.sha256(data).digest()
+    tmp = _stage_bytes_private(AUTH_PATH, data, sha256=digest)
+    try:
+        _backup_current_auth()
+        os.replace(tmp, AUTH_PATH)
+    except BaseException:
+        _discard_tmp(tmp)
+        raise
+    _append_journal(AUTH_PATH, digest, len(data), "switch")
 
 
 def delete_profile(name: str) -> None:
@@ -479,8 +774,10 @@ def delete_profile(name: str) -> None:
     if not profile_dir.exists():
         raise FileNotFoundError(f"Профиль не найден: {name}")
     shutil.rmtree(profile_dir)
+    _invalidate_profiles_cache()
 
 
+@lru_cache(maxsize=256)  # account ids repeat on every refresh()
 def _short(s: str | None, *, keep_start: int = 8, keep_end: int = 4) -> str | None:
     if not s:
         return None
@@ -489,8 +786,21 @@ def _short(s: str | None, *, keep_start: int = 8, keep_end: int = 4) -> str | No
     return f"{s[:keep_start]}…{s[-keep_end:]}"
 
 
+class WslSyncWorker(QObject):
+    """Runs _sync_wsl_windows_auth() off the GUI thread (wslpath/cmd.exe/9P can be slow)."""
+
+    finished = Signal(str)  # status note, "" if nothing was done
+
+    def run(self) -> None:
+        try:
+            note = _sync_wsl_windows_auth()
+        except Exception as e:
+            note = f"WSL: синхронизация не удалась: {e}"
+        self.finished.emit(note or "")
+
+
 class MainWindow(QMainWindow):
-    def __init__(self, *, bootstrap_note: str | None = None) -> None:
+    def __init__(self, *, bootstrap_note: str | None = None, sync_pending: bool = False) -> None:
         super().__init__()
         self.setWindowTitle("Codex Account Switcher")
         self.setMinimumWidth(560)
@@ -506,9 +816,9 @@ class MainWindow(QMainWindow):
         self.codex_home_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
         self.win_codex_home_label: QLabel | None = None
         if _is_wsl():
-            win = str(WINDOWS_CODEX_HOME) if WINDOWS_CODEX_HOME else "(не найден)"
-            self.win_codex_home_label = QLabel(f"Windows CODEX_HOME: {win}")
+            self.win_codex_home_label = QLabel()
             self.win_codex_home_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+            self._update_win_codex_home_label(pending=sync_pending)
         self.save_btn = QPushButton("Сохранить текущий как профиль…")
         self.save_btn.clicked.connect(self.on_save_current)
         current_layout.addWidget(self.current_label)
@@ -528,7 +838,7 @@ class MainWindow(QMainWindow):
         self.delete_btn = QPushButton("Удалить")
         self.delete_btn.clicked.connect(self.on_delete)
         self.refresh_btn = QPushButton("Обновить")
-        self.refresh_btn.clicked.connect(self.refresh)
+        self.refresh_btn.clicked.connect(self.on_refresh)
         self.open_dir_btn = QPushButton("Открыть папку профилей")
         self.open_dir_btn.clicked.connect(self.on_open_profiles_dir)
         actions.addWidget(self.switch_btn)
@@ -550,6 +860,32 @@ class MainWindow(QMainWindow):
         else:
             self.statusBar().showMessage("Готово.")
         self.refresh()
+        if sync_pending:
+            self.statusBar().showMessage("Проверяю Windows…")
+            # The background sync may still copy auth.json over AUTH_PATH and
+            # would silently undo a switch/save made meanwhile
+            self._set_auth_actions_enabled(False)
+
+    def _set_auth_actions_enabled(self, enabled: bool) -> None:
+        self.switch_btn.setEnabled(enabled)
+        self.save_btn.setEnabled(enabled)
+
+    def _update_win_codex_home_label(self, *, pending: bool = False) -> None:
+        if self.win_codex_home_label is None:
+            return
+        if pending:
+            win = "(поиск…)"
+        else:
+            win = str(WINDOWS_CODEX_HOME) if WINDOWS_CODEX_HOME else "(не найден)"
+        self.win_codex_home_label.setText(f"Windows CODEX_HOME: {win}")
+
+    def on_sync_finished(self, note: str | None) -> None:
+        # The sync may have imported auth.json and has found WINDOWS_CODEX_HOME by now
+        self._update_win_codex_home_label()
+        self._set_auth_actions_enabled(True)
+        self.refresh()
+        if note:
+            self.statusBar().showMessage(note)
 
     def refresh(self) -> None:
         current = read_current_auth_info()
@@ -576,24 +912,25 @@ class MainWindow(QMainWindow):
             if p.auth.login_type:
                 label_parts.append(p.auth.login_type)
             item = QListWidgetItem(" — ".join(label_parts))
-            item.setData(Qt.UserRole, p.name)
+            item.setData(Qt.UserRole, p)
             if current.account_id and p.auth.account_id and current.account_id == p.auth.account_id:
                 item.setText("✓ " + item.text())
             self.profiles_list.addItem(item)
 
         self.statusBar().showMessage(f"Профилей: {len(profiles)}")
 
+    def on_refresh(self) -> None:
+        # Explicit refresh also picks up edits made inside profile folders by hand
+        _invalidate_profiles_cache()
+        self.refresh()
+
     def selected_profile(self) -> ProfileInfo | None:
         item = self.profiles_list.currentItem()
         if item is None:
             return None
-        name = item.data(Qt.UserRole)
-        if not isinstance(name, str):
-            return None
-        for p in list_profiles():
-            if p.name == name:
-                return p
-        return None
+        # refresh() stores the ProfileInfo itself on the item — no rescan per click
+        profile = item.data(Qt.UserRole)
+        return profile if isinstance(profile, ProfileInfo) else None
 
     def on_save_current(self) -> None:
         if not AUTH_PATH.exists():
@@ -685,11 +1022,31 @@ class MainWindow(QMainWindow):
 
 
 def main() -> int:
-    bootstrap_note = _sync_wsl_windows_auth()
+    # --no-async-sync: old behaviour, sync on the main thread before the window (debugging)
+    if "--no-async-sync" in sys.argv[1:]:
+        bootstrap_note = _sync_wsl_windows_auth()
+        app = QApplication(sys.argv)
+        window = MainWindow(bootstrap_note=bootstrap_note)
+        window.show()
+        return app.exec()
+
     app = QApplication(sys.argv)
-    window = MainWindow(bootstrap_note=bootstrap_note)
+    window = MainWindow(sync_pending=_is_wsl())
+
+    # The WSL sync probes /mnt/c and may call wslpath/cmd.exe: the window is
+    # shown right away and gets the result through a queued signal.
+    thread = QThread()
+    worker = WslSyncWorker()
+    worker.moveToThread(thread)
+    thread.started.connect(worker.run)
+    worker.finished.connect(window.on_sync_finished)
+    worker.finished.connect(thread.quit)
+    thread.start()
+
     window.show()
-    return app.exec()
+    code = app.exec()
+    thread.wait()
+    return code
 
 
 if __name__ == "__main__":